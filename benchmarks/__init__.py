@@ -0,0 +1,12 @@
+"""Benchmarks for settlement, history storage and chart rendering.
+
+Run from the repository root:
+
+    python -m benchmarks.run                  # every scenario, compared with baseline.json
+    python -m benchmarks.run --quick          # skip the largest sizes
+    python -m benchmarks.run -k history       # only scenarios whose name contains 'history'
+    python -m benchmarks.run --save-baseline  # record this machine's numbers as the baseline
+
+Everything runs headless (the offscreen Qt platform and matplotlib's Agg
+backend), so no display is needed.
+"""
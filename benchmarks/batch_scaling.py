@@ -0,0 +1,93 @@
+"""How batch settlement scales with worker processes (fairshare/parallel.py).
+
+    python -m benchmarks.batch_scaling                  # 1, 2, 4, ... up to one job per CPU
+    python -m benchmarks.batch_scaling --jobs 1 8 32 --groups 200000
+
+Settles the same synthetic CSV input (``python -m fairshare batch``) and
+re-settles the same stored history (``python -m fairshare resettle``) with
+each --jobs value. Reports groups/s and the speedup over a single process,
+and checks that every run writes identical output.
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+from fairshare import BillDatabase, batch
+
+from . import generate
+
+
+def batch_input(groups, group_size, seed=0):
+    # CSV for `groups` groups of between 2 and 2 * group_size people with mixed skews
+    rng = random.Random(seed)
+    lines = ['group,name,amount']
+    for group in range(groups):
+        count = rng.randrange(2, 2 * group_size + 1)
+        amounts = generate.payments(count, generate.SKEWS[group % len(generate.SKEWS)], seed=group)
+        lines.extend(f"g{group},{name},{cents / 100:.2f}" for name, cents in zip(generate.names(count), amounts))
+    return '\n'.join(lines) + '\n'
+
+
+def default_jobs():
+    jobs = [1]
+    while jobs[-1] * 2 <= (os.cpu_count() or 1):
+        jobs.append(jobs[-1] * 2)
+    if jobs[-1] != (os.cpu_count() or 1):
+        jobs.append(os.cpu_count())
+    return jobs
+
+
+def timed(run, jobs):
+    output = io.StringIO()
+    start = time.perf_counter()
+    count = run(output, jobs)
+    return count, time.perf_counter() - start, output.getvalue()
+
+
+def report(title, run, jobs_list):
+    # Prints one table row per jobs value; returns False if any run's output differs
+    print(title)
+    print(f"{'jobs':>5} {'seconds':>9} {'groups/s':>10} {'speedup':>8}")
+    reference = serial_seconds = None
+    for jobs in jobs_list:
+        count, elapsed, output = timed(run, jobs)
+        if reference is None:
+            reference, serial_seconds = output, elapsed
+        elif output != reference:
+            print(f"jobs={jobs} wrote different output", file=sys.stderr)
+            return False
+        print(f"{jobs:5d} {elapsed:9.2f} {count / elapsed:10.0f} {serial_seconds / elapsed:7.2f}x")
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.batch_scaling', description=__doc__.splitlines()[0])
+    parser.add_argument('--groups', type=int, default=50000, help="groups to settle (default 50000)")
+    parser.add_argument('--group-size', type=int, default=10, help="mean people per group (default 10)")
+    parser.add_argument('--months', type=int, default=24000, help="stored months to re-settle (default 24000)")
+    parser.add_argument('--jobs', type=int, nargs='+', help="worker counts to try (default: powers of two up to the CPU count)")
+    args = parser.parse_args(argv)
+
+    jobs_list = args.jobs or default_jobs()
+    data = batch_input(args.groups, args.group_size)
+    print(f"{os.cpu_count()} CPU(s)")
+    if not report(f"batch: {args.groups} groups, {data.count(chr(10)) - 1} records",
+                  lambda output, jobs: batch.run_batch(io.StringIO(data), output, 'csv', 'jsonl',
+                                                       log=io.StringIO(), jobs=jobs)[0], jobs_list):
+        return 1
+
+    with tempfile.TemporaryDirectory(prefix='fairshare-scaling-') as directory:
+        path = os.path.join(directory, 'history.db')
+        generate.history_db(path, args.months, people_per_config=args.group_size)
+        with BillDatabase(path) as db:
+            ok = report(f"resettle: {args.months} months of {args.group_size} people",
+                        lambda output, jobs: batch.resettle(db, output, 'jsonl', jobs=jobs), jobs_list)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""Synthetic data for the benchmarks. Everything is seeded so runs are reproducible."""
+import random
+import sqlite3
+
+from fairshare import BillDatabase, Person, add_months
+from fairshare.migrations import MIGRATIONS
+
+SKEWS = ('uniform', 'pareto', 'single')
+
+
+def payments(count, skew='uniform', seed=0):
+    # count payments in cents:
+    #   uniform - everyone pays something between $0 and $200
+    #   pareto  - a few people pay most of the bill, most pay little or nothing
+    #   single  - one person pays the whole bill
+    rng = random.Random(seed)
+    if skew == 'uniform':
+        return [rng.randrange(0, 20000) for _ in range(count)]
+    if skew == 'pareto':
+        return [int((rng.paretovariate(1.16) - 1) * 2000) for _ in range(count)]
+    if skew == 'single':
+        amounts = [0] * count
+        amounts[rng.randrange(count)] = rng.randrange(10000, 1000000)
+        return amounts
+    raise ValueError(f"Unknown skew: {skew!r}")
+
+
+def names(count):
+    return [f"person{i:05d}" for i in range(count)]
+
+
+def people(count, skew='uniform', seed=0):
+    return [Person(name, amount) for name, amount in zip(names(count), payments(count, skew, seed))]
+
+
+def months(count, start='2000-01'):
+    return [add_months(start, i) for i in range(count)]
+
+
+def history_db(path, rows, months_per_config=120, people_per_config=4, seed=0):
+    # A current-schema database holding `rows` bill_history rows, spread over as many
+    # configurations as it takes at months_per_config each, with a payment per person
+    # per month. Returns the names of the configurations.
+    rng = random.Random(seed)
+    config_count = max(1, -(-rows // months_per_config))
+    config_names = [f"config{i:05d}" for i in range(config_count)]
+    person_names = names(people_per_config)
+    keys = months(months_per_config)
+
+    with BillDatabase(path) as db:
+        for config_name in config_names:
+            db.save_configuration(config_name, person_names, False)
+        config_ids = dict(db.c.execute("SELECT config_name, config_id FROM configurations"))
+        person_ids = {}
+        for config_id, name, person_id in db.c.execute("SELECT config_id, name, person_id FROM people"):
+            person_ids.setdefault(config_id, []).append(person_id)
+
+        history = []
+        payment_rows = []
+        remaining = rows
+        for config_name in config_names:
+            config_id = config_ids[config_name]
+            for month in keys[:min(remaining, months_per_config)]:
+                amounts = [rng.randrange(0, 20000) for _ in person_ids[config_id]]
+                history.append((config_id, sum(amounts), month))
+                payment_rows.extend(zip(person_ids[config_id], [month] * len(amounts), amounts))
+            remaining -= months_per_config
+        db.c.executemany("INSERT INTO bill_history (config_id, total_bill, bill_month) VALUES (?, ?, ?)", history)
+        db.c.executemany("INSERT INTO payments (person_id, bill_month, amount) VALUES (?, ?, ?)", payment_rows)
+        db.conn.commit()
+    return config_names
+
+
+def legacy_db(path, rows, months_per_config=120, seed=0):
+    # A database in the original schema (REAL dollars, 'MM/YYYY' months, comma-joined
+    # person_names, no user_version) for timing the migrations
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    c = conn.cursor()
+    MIGRATIONS[0](c)
+    config_count = max(1, -(-rows // months_per_config))
+    c.executemany("INSERT INTO configurations (config_id, config_name, person_names, show_individuals) VALUES (?, ?, ?, 0)",
+                  [(i + 1, f"config{i:05d}", ','.join(names(4))) for i in range(config_count)])
+    keys = [f"{key[5:]}/{key[:4]}" for key in months(months_per_config)]
+    c.executemany("INSERT INTO bill_history (config_id, total_bill, bill_month) VALUES (?, ?, ?)",
+                  ((i // months_per_config + 1, rng.randrange(0, 80000) / 100, keys[i % months_per_config])
+                   for i in range(rows)))
+    conn.commit()
+    conn.close()
@@ -0,0 +1,139 @@
+"""Load test for the JSON API (fairshare/server.py).
+
+    python -m benchmarks.load_test                       # starts a server on a scratch database
+    python -m benchmarks.load_test --url 127.0.0.1:8080  # or tests one that is already running
+
+Opens --clients keep-alive connections that each send --requests requests,
+cycling through settle, configs, history reads and writes. It then reports
+throughput and latency percentiles for each endpoint.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from fairshare import BillDatabase
+from fairshare.server import Server
+
+from . import generate
+
+
+def request_mix(client, count, config_name, group_size):
+    # (label, method, path, body) tuples for one client
+    people = generate.people(group_size, 'pareto', seed=client)
+    settle_body = json.dumps({'payments': {p.name: f"{p.val / 100:.2f}" for p in people}})
+    months = generate.months(240)
+    for i in range(count):
+        kind = i % 4
+        if kind == 0:
+            yield 'settle', 'POST', '/settle', settle_body
+        elif kind == 1:
+            yield 'configs', 'GET', '/configs', None
+        elif kind == 2:
+            yield 'history read', 'GET', f'/history/{config_name}', None
+        else:
+            body = json.dumps({'month': months[(client + i) % len(months)], 'amount': str(i)})
+            yield 'history write', 'POST', f'/history/{config_name}', body
+
+
+async def client(host, port, requests, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for label, method, path, body in requests:
+            data = body.encode('utf-8') if body else b''
+            head = f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Length: {len(data)}\r\n\r\n"
+            start = time.perf_counter()
+            writer.write(head.encode('latin-1') + data)
+            await writer.drain()
+
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                if name.lower() == 'content-length':
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.setdefault(label, []).append(time.perf_counter() - start)
+            if status != 200:
+                errors.append((label, status))
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, clients, requests, config_name, group_size):
+    latencies = {}
+    errors = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, request_mix(i, requests, config_name, group_size), latencies, errors)
+                           for i in range(clients)))
+    return time.perf_counter() - start, latencies, errors
+
+
+def start_local_server(directory, workers):
+    # A server on an ephemeral port in a background thread, with one saved configuration
+    path = os.path.join(directory, 'configurations.db')
+    with BillDatabase(path) as db:
+        db.save_configuration('loadtest', generate.names(4), False)
+    ready = threading.Event()
+    address = []
+
+    def on_ready(bound):
+        address.extend(bound)
+        ready.set()
+
+    loop = asyncio.new_event_loop()
+    server = Server(path, workers)
+    task = loop.create_task(server.serve('127.0.0.1', 0, on_ready))
+    thread = threading.Thread(target=loop.run_until_complete, args=(task,), daemon=True)
+    thread.start()
+    ready.wait()
+    return address[0], address[1], 'loadtest'
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.load_test', description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="HOST:PORT of a running server (default: start one)")
+    parser.add_argument('--config', default='loadtest', help="configuration to read and write history for")
+    parser.add_argument('--clients', type=int, default=50, help="concurrent connections (default 50)")
+    parser.add_argument('--requests', type=int, default=200, help="requests per connection (default 200)")
+    parser.add_argument('--group-size', type=int, default=20, help="people per settle request (default 20)")
+    parser.add_argument('--workers', type=int, default=4, help="worker threads for a started server (default 4)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='fairshare-load-') as directory:
+        if args.url:
+            host, _, port = args.url.rpartition(':')
+            port, config_name = int(port), args.config
+        else:
+            host, port, config_name = start_local_server(directory, args.workers)
+        elapsed, latencies, errors = asyncio.run(
+            run_load(host, port, args.clients, args.requests, config_name, args.group_size))
+
+    total = sum(len(values) for values in latencies.values())
+    print(f"{total} requests from {args.clients} clients in {elapsed:.2f}s ({total / elapsed:.0f} requests/s)")
+    print(f"{'endpoint':<16} {'count':>7} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for label, values in sorted(latencies.items()):
+        print(f"{label:<16} {len(values):7d} " + ' '.join(
+            f"{seconds * 1000:7.2f}ms" for seconds in (statistics.mean(values), percentile(values, 0.5),
+                                                        percentile(values, 0.95), percentile(values, 0.99))))
+    if errors:
+        print(f"{len(errors)} request(s) failed, e.g. {errors[0][0]} -> HTTP {errors[0][1]}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,293 @@
+"""Runs the benchmark scenarios and compares them with benchmarks/baseline.json.
+
+Each scenario is timed over several runs (the median is reported) and then run
+once more under tracemalloc for its peak Python memory. A scenario is flagged
+when either number exceeds the baseline by more than --threshold.
+"""
+import argparse
+import io
+import itertools
+import json
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Headless: set before Qt or matplotlib are imported
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+from fairshare import BillDatabase, Group, Person, calculate_bills, current_month, history_io
+from fairshare.migrations import migrate
+
+from . import generate
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+GROUP_SIZES = (2, 100, 1000, 10000)
+MEMBERSHIP_SIZE = 100000  # people in the group/* scenarios, which compare how a group is held
+HISTORY_ROWS = (12, 10000, 1000000)
+CHART_POINTS = (12, 120, 1000, 10000)
+LARGE_ROWS = 100000  # history sizes above this are skipped with --quick
+LARGE_POINTS = 1000  # and so are charts with more points than this
+# Differences below these are noise, so ratios are taken against at least this much
+TIME_FLOOR = 0.001
+MEMORY_FLOOR_KIB = 64
+
+_series_keys = itertools.count()
+
+
+class Scenario:
+    # setup() runs untimed before every run and returns the arguments for run().
+    # Large scenarios are skipped with --quick and only timed once.
+    def __init__(self, name, run, setup=tuple, large=False):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.large = large
+
+
+class Workspace:
+    # Generated databases and the Qt objects, created on first use and shared by scenarios
+    def __init__(self, directory):
+        self.directory = directory
+        self.history_dbs = {}
+        self.legacy_dbs = {}
+        self.exports = {}
+        self.app = None
+        self.calculator = None
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def history_db(self, rows):
+        if rows not in self.history_dbs:
+            path = self.path(f"history_{rows}.db")
+            config_names = generate.history_db(path, rows)
+            self.history_dbs[rows] = (BillDatabase(path), config_names[-1])
+        return self.history_dbs[rows]
+
+    def history_export(self, rows):
+        # The history_db's own history as CSV, so importing it back changes no totals
+        if rows not in self.exports:
+            output = io.StringIO()
+            history_io.export_history(self.history_db(rows)[0], output)
+            self.exports[rows] = output.getvalue()
+        return self.exports[rows]
+
+    def legacy_copy(self, rows):
+        # A fresh copy for every run, since migrating changes the file
+        if rows not in self.legacy_dbs:
+            self.legacy_dbs[rows] = self.path(f"legacy_{rows}.db")
+            generate.legacy_db(self.legacy_dbs[rows], rows)
+        path = self.path('migrating.db')
+        shutil.copyfile(self.legacy_dbs[rows], path)
+        return path
+
+    def graph_page(self):
+        if self.calculator is None:
+            from PyQt5.QtWidgets import QApplication
+            # Point BillCalculator at a scratch database, and at the assets, which it
+            # opens relative to the working directory
+            os.environ['FAIRSHARE_DB'] = self.path('configurations.db')
+            os.symlink(os.path.join(REPO_ROOT, 'assets'), self.path('assets'))
+            os.chdir(self.directory)
+            sys.path.insert(0, REPO_ROOT)
+            import bills
+            self.app = QApplication.instance() or QApplication([])
+            self.calculator = bills.BillCalculator()
+            self.page = bills.GraphPage(self.calculator)
+            self.page.resize(400, 600)
+        return self.page
+
+    def close(self):
+        for db, _ in self.history_dbs.values():
+            db.close()
+        if self.calculator is not None:
+            self.calculator.db_worker.stop()
+
+
+def chart_series(points):
+    # Shaped like bills.fetch_series output
+    import numpy
+    from matplotlib import dates as mdates
+    dates = mdates.date2num(numpy.array(generate.months(points), dtype='datetime64[M]'))
+    values = numpy.array(generate.payments(points, 'uniform'), dtype=float) / 100
+    return dates, values, (values, values)
+
+
+def new_series_key():
+    # A key GraphPage has not drawn before, so the axes are rescaled as for a new series
+    return (f"benchmark{next(_series_keys)}", None)
+
+
+def render(page, key, series):
+    page.render_series(key, series)
+    page.canvas.draw()  # render_series only schedules a draw; do it now so it is timed
+
+
+def scenarios(ws):
+    result = []
+    for skew in generate.SKEWS:
+        for size in GROUP_SIZES:
+            persons = generate.people(size, skew)
+            result.append(Scenario(f"settle/{skew}/{size}", calculate_bills,
+                                   lambda persons=persons: (persons, True)))
+
+    names = generate.names(MEMBERSHIP_SIZE)
+    amounts = generate.payments(MEMBERSHIP_SIZE)
+    result.append(Scenario(f"group/persons/{MEMBERSHIP_SIZE}",
+                           lambda: [Person(name, cents) for name, cents in zip(names, amounts)]))
+    result.append(Scenario(f"group/columnar/{MEMBERSHIP_SIZE}", lambda: Group(names, amounts)))
+
+    for size in (4, 1000):
+        def record_setup(size=size):
+            db, config_name = ws.history_db(12)
+            payments = dict(zip(generate.names(size), generate.payments(size)))
+            db.save_configuration(config_name, list(payments), False)
+            return db, config_name, current_month(), sum(payments.values()), payments
+        result.append(Scenario(f"record_bill/{size}", lambda db, *args: db.record_bill(*args), record_setup))
+
+    for rows in HISTORY_ROWS:
+        large = rows > LARGE_ROWS
+        result.append(Scenario(f"history/fetch_monthly_data/{rows}",
+                               lambda db, config_name: db.fetch_monthly_data(config_name),
+                               lambda rows=rows: ws.history_db(rows), large))
+        result.append(Scenario(f"history/fetch_person_history/{rows}",
+                               lambda db, config_name: db.fetch_person_history(config_name, generate.names(1)[0]),
+                               lambda rows=rows: ws.history_db(rows), large))
+        result.append(Scenario(f"history/export/{rows}", export_history,
+                               lambda rows=rows: (ws.history_db(rows)[0],), large))
+        result.append(Scenario(f"history/import/{rows}", history_io.import_history,
+                               lambda rows=rows: (ws.history_db(rows)[0], io.StringIO(ws.history_export(rows))), large))
+        result.append(Scenario(f"migrate/{rows}", migrate_file, lambda rows=rows: (ws.legacy_copy(rows),), large))
+
+    for points in CHART_POINTS:
+        series = chart_series(points)
+        result.append(Scenario(f"chart/render/{points}", render,
+                               lambda series=series: (ws.graph_page(), new_series_key(), series),
+                               points > LARGE_POINTS))
+
+    for rows in HISTORY_ROWS:
+        def update_graph_setup(rows=rows):
+            db, config_name = ws.history_db(rows)
+            return ws.graph_page(), db, config_name
+        result.append(Scenario(f"chart/update_graph/{rows}", update_graph, update_graph_setup, rows > LARGE_ROWS))
+    return result
+
+
+def migrate_file(path):
+    conn = sqlite3.connect(path)
+    try:
+        migrate(conn)
+    finally:
+        conn.close()
+
+
+def export_history(db):
+    with open(os.devnull, 'w', newline='') as f:
+        history_io.export_history(db, f)
+
+
+def update_graph(page, db, config_name):
+    # What GraphPage.update_graph does for the total, without the worker thread in between
+    import bills  # importable once graph_page() has set up the path
+    render(page, new_series_key(), bills.fetch_series(db, config_name))
+
+
+def measure(scenario, repeat):
+    times = []
+    for _ in range(repeat):
+        args = scenario.setup()
+        start = time.perf_counter()
+        scenario.run(*args)
+        times.append(time.perf_counter() - start)
+
+    args = scenario.setup()
+    tracemalloc.start()
+    try:
+        scenario.run(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'seconds': statistics.median(times), 'peak_kib': peak / 1024}
+
+
+def load_baseline(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def compare(result, baseline, threshold):
+    # Returns (time ratio, memory ratio, flagged) against the baseline entry, if any
+    if not baseline:
+        return None, None, False
+    time_ratio = max(result['seconds'], TIME_FLOOR) / max(baseline['seconds'], TIME_FLOOR)
+    memory_ratio = max(result['peak_kib'], MEMORY_FLOOR_KIB) / max(baseline['peak_kib'], MEMORY_FLOOR_KIB)
+    flagged = time_ratio > threshold or memory_ratio > threshold
+    return time_ratio, memory_ratio, flagged
+
+
+def format_ratio(ratio):
+    return f"{ratio:6.2f}x" if ratio is not None else "      -"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run', description=__doc__.splitlines()[0])
+    parser.add_argument('-k', dest='pattern', default='', help="only run scenarios whose name contains this")
+    parser.add_argument('--quick', action='store_true', help="skip the largest histories and charts")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per scenario (default 5)")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="baseline JSON to compare with")
+    parser.add_argument('--save-baseline', action='store_true', help="write the results to the baseline file")
+    parser.add_argument('--threshold', type=float, default=1.5,
+                        help="flag scenarios slower or bigger than baseline by this factor (default 1.5)")
+    parser.add_argument('--check', action='store_true', help="exit with status 1 if any scenario is flagged")
+    args = parser.parse_args(argv)
+
+    baseline = load_baseline(args.baseline)
+    results = {}
+    flagged = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='fairshare-bench-') as directory:
+        ws = Workspace(directory)
+        try:
+            print(f"{'scenario':<40} {'median':>10} {'peak':>12} {'time':>8} {'memory':>8}")
+            for scenario in scenarios(ws):
+                if args.pattern not in scenario.name or (args.quick and scenario.large):
+                    continue
+                result = measure(scenario, 1 if scenario.large else args.repeat)
+                results[scenario.name] = result
+                time_ratio, memory_ratio, regressed = compare(result, baseline.get(scenario.name), args.threshold)
+                if regressed:
+                    flagged.append(scenario.name)
+                print(f"{scenario.name:<40} {result['seconds'] * 1000:8.2f}ms {result['peak_kib']:9.0f}KiB "
+                      f"{format_ratio(time_ratio)} {format_ratio(memory_ratio)}{'  <-- regression' if regressed else ''}",
+                      flush=True)
+        finally:
+            ws.close()
+            os.chdir(cwd)
+
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Saved {len(results)} result(s) to {args.baseline}")
+
+    if flagged:
+        print(f"{len(flagged)} scenario(s) exceeded the baseline by more than {args.threshold}x", file=sys.stderr)
+        if args.check:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
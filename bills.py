@@ -1,24 +1,72 @@
+import itertools
+import os
+import queue
+import sqlite3
 import sys
+import time
+
+
+class StartupTimer:
+    # Times each startup phase up to the main window's first paint. The report is
+    # printed when FAIRSHARE_STARTUP_TIMING is set, e.g. to check a bills.spec bundle.
+    def __init__(self):
+        self.start = self.last = time.perf_counter()
+        self.phases = []
+        self.finished = False
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def finish(self, file=sys.stderr):
+        self.mark('first paint')
+        self.finished = True
+        if os.environ.get('FAIRSHARE_STARTUP_TIMING'):
+            for phase, seconds in self.phases:
+                print(f"{phase:<12} {seconds * 1000:8.1f} ms", file=file)
+            print(f"{'total':<12} {(self.last - self.start) * 1000:8.1f} ms", file=file)
+
+
+startup_timer = StartupTimer()  # Started before the Qt imports so they are counted
+
 from PyQt5.QtWidgets import (
     QStackedLayout, QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-    QLineEdit, QPushButton, QScrollArea, QFrame, QCheckBox, QInputDialog, QComboBox
+    QLineEdit, QPushButton, QCheckBox, QInputDialog, QComboBox, QFileDialog,
+    QListView, QStyledItemDelegate, QAbstractItemView
 )
-from PyQt5.QtCore import Qt, QSize
-from PyQt5.QtGui import QFont, QIcon, QFontDatabase
-import datetime
-import sqlite3
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-import matplotlib.font_manager
+from PyQt5.QtCore import (
+    Qt, QEvent, QSize, QObject, QRunnable, QThread, QThreadPool, QTimer, QAbstractListModel, QModelIndex, pyqtSignal
+)
+from PyQt5.QtGui import QFont, QIcon, QFontDatabase, QTextDocument
+from fairshare import (
+    BillDatabase, Group, LiveLedger, Person, SettlementCache, calculate_bills, format_cents, format_month, month_key, parse_cents, previous_month,
+    settlement_key
+)
+from fairshare import trace
 
-global font_regular, font_bold
+startup_timer.mark('imports')
 
-class Person:
-    def __init__(self, name, val=0):
-        self.name = name
-        self.val = val
+# Rules shared by many widgets, applied once to the main window; widgets pick theirs
+# with the "role" property instead of each parsing a copy of the same stylesheet
+STYLESHEET = """
+* { background-color: #391053; }
+QPushButton[role="boxed"] { color: white; border: 1px solid white; background-color: #5a2675; padding: 6px; }
+QPushButton[role="icon"] { border: none; background-color: transparent; }
+QComboBox[role="boxed"] { color: white; background-color: #5a2675; border: 1px solid white; }
+QComboBox[role="field"] { color: white; border: 1px solid white; background-color: #5a2675; padding: 6px; combobox-popup: 0; }
+QLineEdit[role="field"] { color: white; border: 1px solid white; background-color: #5a2675; padding: 6px; }
+QLabel[role="payment"] { color: white; }
+QLineEdit[role="payment"] { color: white; background-color: #5a2675; }
+"""
+
+_fonts = None  # (font_regular, font_bold) once add_fonts has registered them
 
 def add_fonts():
+    # The font files are only registered the first time; later calls share the same fonts
+    global _fonts
+    if _fonts is not None:
+        return _fonts
     font_regular = None
     font_bold = None
 
@@ -34,81 +82,246 @@ def add_fonts():
         fontFamilies = QFontDatabase.applicationFontFamilies(fontId)
         font_bold = QFont(fontFamilies[0], 18)
 
-    return font_regular, font_bold
+    _fonts = font_regular, font_bold
+    return _fonts
+
+class DatabaseWorker(QThread):
+    # Runs every database call on its own thread with its own connection, one at a
+    # time in submission order, so writes are serialized and the GUI never waits on
+    # SQLite. Jobs are fn(db, *args); results come back to the GUI thread through
+    # result_ready and are handed to the job's callback.
+    #
+    # Reads can be submitted on a channel (e.g. 'graph'): a newer request on the same
+    # channel supersedes an older one, which is skipped if it has not started yet and
+    # whose result is dropped if it has. Writes are submitted without a channel and
+    # always run.
+    #
+    # Jobs that queue up while one runs (e.g. saving a configuration and recording
+    # its bill) are run together in one transaction, each in its own savepoint so a
+    # failing job does not undo the others, and cost a single commit. The transaction
+    # takes the write lock before the first job runs (see BillDatabase.transaction).
+    result_ready = pyqtSignal(int, object)
+    request_failed = pyqtSignal(int, str)
+    history_changed = pyqtSignal(str)  # config_name whose history was written
+
+    MAX_BATCH = 64
+
+    def __init__(self, path=None, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.jobs = queue.Queue()
+        self.callbacks = {}  # request id -> (channel, callback)
+        self.latest = {}  # channel -> newest request id
+        self.request_ids = itertools.count(1)
+        self.result_ready.connect(self._deliver)
+        self.request_failed.connect(self._report_failure)
+
+    def submit(self, fn, *args, callback=None, channel=None):
+        request_id = next(self.request_ids)
+        if channel is not None:
+            self.callbacks.pop(self.latest.get(channel), None)
+            self.latest[channel] = request_id
+        if callback:
+            self.callbacks[request_id] = (channel, callback)
+        self.jobs.put((request_id, channel, fn, args))
+        return request_id
+
+    def cancel(self, channel):
+        # Drop whatever is pending on channel
+        self.callbacks.pop(self.latest.pop(channel, None), None)
+
+    def is_stale(self, request_id, channel):
+        return channel is not None and self.latest.get(channel) != request_id
+
+    def run(self):
+        db = BillDatabase(self.path)
+        db.add_history_listener(self.history_changed.emit)
+        running = True
+        while running:
+            batch = [self.jobs.get()]
+            while len(batch) < self.MAX_BATCH and not self.jobs.empty():
+                batch.append(self.jobs.get())
+            if None in batch:
+                running = False
+                batch = batch[:batch.index(None)]
+            results = []
+            try:
+                with db.transaction():
+                    for request_id, channel, fn, args in batch:
+                        if self.is_stale(request_id, channel):
+                            continue  # Superseded before it started
+                        try:
+                            with db.transaction():
+                                results.append((request_id, fn(db, *args), None))
+                        except Exception as e:
+                            results.append((request_id, None, str(e)))
+            except sqlite3.Error as e:
+                # The write lock was still held elsewhere after the busy timeout, or the
+                # commit failed: nothing in the batch was written
+                results = [(request_id, None, str(e)) for request_id, *_ in batch]
+            # Results go out once the batch has committed
+            for request_id, result, error in results:
+                if error is None:
+                    self.result_ready.emit(request_id, result)
+                else:
+                    self.request_failed.emit(request_id, error)
+        db.close()
 
-def calculate_bills(persons, show_individuals):
-    print("entering calculate_bills")
-    total = sum(p.val for p in persons)
-    per_person = total / len(persons) if persons else 0
-    results = []
+    def stop(self):
+        self.jobs.put(None)
+        self.wait()
 
-    # Calculate initial debts or credits for each person
-    debts = [[p, per_person - p.val] for p in persons]
-    final_balances = {p.name: per_person - p.val for p in persons}  # Track final balances
+    def _deliver(self, request_id, result):
+        channel, callback = self.callbacks.pop(request_id, (None, None))
+        if callback and not self.is_stale(request_id, channel):
+            callback(result)
 
-    # Separate out debtors and creditors
-    debtors = [[p.name, amount] for p, amount in debts if amount > 0]
-    creditors = [[p.name, amount] for p, amount in debts if amount < 0]
+    def _report_failure(self, request_id, message):
+        self.callbacks.pop(request_id, None)
+        print(f"Database error: {message}")
 
-    # Processing payments from debtors to creditors
-    for debtor in debtors:
-        debtor_name, debtor_amount = debtor
 
-        while debtor_amount > 0:
-            for creditor in creditors:
-                creditor_name, creditor_amount = creditor
+class SettlementSignals(QObject):
+    finished = pyqtSignal(int, str)  # generation, calculate_bills output
 
-                if creditor_amount >= 0:
-                    continue  # Skip if this creditor has no more to be reimbursed
 
-                pay_amount = min(debtor_amount, -creditor_amount)
-                debtor_amount -= pay_amount
-                creditor[1] += pay_amount  # Update the creditor's remaining credit
+class SettlementTask(QRunnable):
+    # Runs calculate_bills on the thread pool; generation lets the GUI ignore results
+    # from calculations that were superseded while they ran
+    def __init__(self, generation, persons, show_individuals, signals):
+        super().__init__()
+        self.generation = generation
+        self.persons = persons
+        self.show_individuals = show_individuals
+        self.signals = signals
+
+    def run(self):
+        self.signals.finished.emit(self.generation, calculate_bills(self.persons, self.show_individuals))
+
+
+class PersonEntryRow:
+    # A "<name>'s payment:" label and its QLineEdit, recycled between people.
+    # on_edited(name, text) is called whenever the user types into the entry.
+    def __init__(self, font, on_edited):
+        self.name = None
+
+        # Create and style the label
+        self.label = QLabel()
+        self.label.setProperty('role', 'payment')  # White text, from STYLESHEET
+        self.label.setFont(font)  # Apply common font
+
+        # Create and style the entry box
+        self.entry = QLineEdit()
+        self.entry.setFont(font)  # Apply common font
+        self.entry.setProperty('role', 'payment')  # White text on a darker shade, from STYLESHEET
+        # textEdited rather than textChanged: clearing the entry in assign() is not an edit
+        self.entry.textEdited.connect(lambda text: on_edited(self.name, text))
+
+        # Create a container widget to hold the label and entry side by side
+        self.container = QWidget()
+        container_layout = QHBoxLayout(self.container)  # Use this layout to arrange elements horizontally within the container
+        container_layout.addWidget(self.label)
+        container_layout.addWidget(self.entry)
+        container_layout.setContentsMargins(0, 0, 0, 0)  # Remove margins if desired
+
+    def assign(self, name):
+        self.name = name
+        self.label.setText(f"{name}'s payment:")
+        self.entry.setObjectName(f"entry_for_{name}")  # Set unique object name
+        self.entry.clear()
 
-                # Update final balances for debtor and creditor
-                final_balances[debtor_name] -= pay_amount
-                final_balances[creditor_name] += pay_amount
 
-                # Formatting the transaction with HTML for green and bold "pays" and bold amount
-                transaction = f"{debtor_name} <b><span style='color: green;'>pays</span></b> {creditor_name} <b>${pay_amount:.2f}</b>"
-                results.append(transaction)
+class ResultsModel(QAbstractListModel):
+    # The settlement lines (HTML snippets) shown under the Calculate button
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.lines = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.lines)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return self.lines[index.row()]
+        return None
+
+    @trace.traced()
+    def set_results(self, lines):
+        lines = list(lines)
+        if len(lines) != len(self.lines):
+            self.beginResetModel()
+            self.lines = lines
+            self.endResetModel()
+            return
+
+        # Same number of rows: only report the ones whose text changed
+        changed = [row for row, (old, new) in enumerate(zip(self.lines, lines)) if old != new]
+        self.lines = lines
+        if changed:
+            self.dataChanged.emit(self.index(changed[0]), self.index(changed[-1]), [Qt.DisplayRole])
 
-                if debtor_amount <= 0:
-                    break
 
-    # If show_individuals is True, add individual's final balances
-    if show_individuals:
-        for name, balance in final_balances.items():
-            adjusted_balance = per_person - balance  # This is the final amount they need to settle up
-            if adjusted_balance > 0:
-                results.append(f"{name} is actually paying: <b>${adjusted_balance:.2f}</b>")
-            else:
-                results.append(f"{name} is owed: <b>${-adjusted_balance:.2f}</b>")
+class RichTextDelegate(QStyledItemDelegate):
+    # Paints each row's HTML in white with the app font. The laid-out QTextDocument
+    # for a line is cached, so scrolling and repaints don't parse the HTML again.
+    MAX_CACHED = 2000
+
+    def __init__(self, font, parent=None):
+        super().__init__(parent)
+        self.font = font
+        self.documents = {}
+
+    def document(self, html):
+        doc = self.documents.get(html)
+        if doc is None:
+            if len(self.documents) >= self.MAX_CACHED:
+                self.documents.clear()
+            doc = QTextDocument()
+            doc.setDefaultFont(self.font)
+            doc.setDocumentMargin(2)
+            doc.setHtml(f"<span style='color: #ffffff;'>{html}</span>")
+            self.documents[html] = doc
+        return doc
+
+    def paint(self, painter, option, index):
+        doc = self.document(index.data())
+        painter.save()
+        painter.translate(option.rect.topLeft())
+        doc.drawContents(painter)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        size = self.document(index.data() or '').size()
+        return QSize(int(size.width()), int(size.height()))
 
-    print("leaving on_calculate")
-    return "\n".join(results)
 
 class BillCalculator(QWidget):
     def __init__(self):
         super().__init__()
-        self.persons = []  # Initialize an empty list of persons
-        self.person_entries = []  # Initialize an empty list for person entry widgets
+        self.group = Group()  # The people in the current configuration and what each paid
+        self.entry_rows = {}  # name -> PersonEntryRow currently shown for that person
+        self.entry_by_name = {}  # name -> that row's QLineEdit, for O(1) lookups
+        self.row_order = []  # names of the shown rows, in layout order
+        self.spare_rows = []  # hidden rows kept for reuse
         self.show_individuals = False  # Default value
+        self.live_updates = False  # Recalculate while amounts are typed (toggled in Settings)
+        self.ledger = LiveLedger()  # Running total for live updates
+        self.invalid_entries = set()  # names whose entry can't currently be parsed
         self.init_database()
+        startup_timer.mark('database')
         self.initUI()
 
     def initUI(self):
         self.setWindowTitle("Bill's Bill Calculator")
-        self.setStyleSheet("background-color: #391053")
+        self.setStyleSheet(STYLESHEET)
         self.font_regular, self.font_bold = add_fonts()
+        startup_timer.mark('fonts')
 
         main_layout = QVBoxLayout(self)
-        # Calculate previous month and current year for title
-        # Calculate previous month and current year for title
-        current_date = datetime.datetime.now()
-        first_day_of_current_month = current_date.replace(day=1)
-        last_day_of_previous_month = first_day_of_current_month - datetime.timedelta(days=1)
-        self.previous_month_year = last_day_of_previous_month.strftime("%m/%Y")  # Changed to MM/YYYY
+        # Bills are entered for the previous month: bill_month is the 'YYYY-MM' key it is
+        # stored under and previous_month_year the MM/YYYY shown in the title
+        self.bill_month = previous_month()
+        self.previous_month_year = format_month(self.bill_month)
 
 
         # Create a stacked layout to switch between main page and settings
@@ -118,14 +331,12 @@ class BillCalculator(QWidget):
         self.main_page = QWidget()
         self.setupMainPage()  # Set up the main page UI
         self.stacked_layout.addWidget(self.main_page)
+        startup_timer.mark('main page')
 
-        self.graph_page = GraphPage(self)
-        
-        self.stacked_layout.addWidget(self.graph_page)
-
-        # Second page (Settings UI)
-        self.settings_page = SettingsPage(self)
-        self.stacked_layout.addWidget(self.settings_page)
+        # The graph (with matplotlib) and settings pages are built the first time
+        # they are shown
+        self.graph_page = None
+        self.settings_page = None
 
         # Add the stacked layout to the main layout
         main_layout.addLayout(self.stacked_layout)
@@ -137,7 +348,7 @@ class BillCalculator(QWidget):
         back_button = QPushButton()  # No text needed, as we're using an icon
         back_button.setIcon(QIcon('assets/back_icon.png'))
         back_button.setIconSize(QSize(36, 36))
-        back_button.setStyleSheet("QPushButton { border: none; background-color: transparent; }")
+        back_button.setProperty('role', 'icon')
         back_button.clicked.connect(self.show_main_page)  # Connect to show_main_page method
         bottom_layout.addWidget(back_button)
 
@@ -148,13 +359,13 @@ class BillCalculator(QWidget):
         self.load_dropdown.setMinimumWidth(200)
         self.load_dropdown.setMaximumWidth(200)
         self.load_dropdown.setFont(self.font_regular)
-        self.load_dropdown.setStyleSheet("QComboBox { color: white; background-color: #5a2675; border: 1px solid white; }")
+        self.load_dropdown.setProperty('role', 'boxed')
         self.update_dropdown()  # Populate the dropdown
 
         # Load button next to dropdown
         load_button = QPushButton("Load")
         load_button.setFont(self.font_regular)
-        load_button.setStyleSheet("QPushButton { color: white; background-color: #5a2675; border: 1px solid white; padding: 6px}")
+        load_button.setProperty('role', 'boxed')
         load_button.clicked.connect(self.load_settings)
 
         bottom_layout.addWidget(self.load_dropdown)
@@ -163,14 +374,14 @@ class BillCalculator(QWidget):
         # Save button
         save_button = QPushButton("Save")
         save_button.setFont(self.font_regular)
-        save_button.setStyleSheet("QPushButton { color: white; background-color: #5a2675; border: 1px solid white; padding: 6px}")
+        save_button.setProperty('role', 'boxed')
         save_button.clicked.connect(self.save_settings)  # Connect to a function to save settings
         bottom_layout.addWidget(save_button)
 
         # Add Delete button
         delete_button = QPushButton("Delete")
         delete_button.setFont(self.font_regular)
-        delete_button.setStyleSheet("QPushButton { color: white; background-color: #5a2675; border: 1px solid white; padding: 6px}")
+        delete_button.setProperty('role', 'boxed')
         delete_button.clicked.connect(self.delete_config)
         bottom_layout.addWidget(delete_button)
 
@@ -180,7 +391,7 @@ class BillCalculator(QWidget):
         graph_button = QPushButton()  # No text needed, as we're using an icon
         graph_button.setIcon(QIcon('assets/graph_icon.png'))
         graph_button.setIconSize(QSize(48, 48))  # Adjust size as needed
-        graph_button.setStyleSheet("QPushButton { border: none; background-color: transparent; }")
+        graph_button.setProperty('role', 'icon')
         graph_button.clicked.connect(self.show_graph)  # Connect to a method to show graph
         bottom_layout.addWidget(graph_button)
 
@@ -188,7 +399,7 @@ class BillCalculator(QWidget):
         settings_button = QPushButton()  # No text needed, as we're using an icon
         settings_button.setIcon(QIcon('assets/settings_icon.png'))
         settings_button.setIconSize(QSize(48, 48))
-        settings_button.setStyleSheet("QPushButton { border: none; background-color: transparent; }")
+        settings_button.setProperty('role', 'icon')
         settings_button.clicked.connect(self.show_settings)  # Connect to the show_settings method
         bottom_layout.addWidget(settings_button)
 
@@ -197,28 +408,33 @@ class BillCalculator(QWidget):
 
         self.setLayout(main_layout)
         self.resize(400, 800)
+        startup_timer.mark('window')
+
+    def event(self, event):
+        result = super().event(event)
+        if event.type() == QEvent.Paint and not startup_timer.finished:
+            startup_timer.finish()
+        return result
     
     def init_database(self):
-        self.conn = sqlite3.connect('configurations.db')
-        self.c = self.conn.cursor()
-        # Uncomment the next 2 lines to reset the table
-        # self.c.execute('DROP TABLE IF EXISTS configurations')
-        # self.c.execute('DROP TABLE IF EXISTS bill_history')
-
-        self.c.execute('''CREATE TABLE IF NOT EXISTS configurations (
-                        config_id INTEGER PRIMARY KEY,
-                        config_name TEXT UNIQUE,
-                        person_names TEXT,
-                        show_individuals BOOLEAN)''')
-        
-        self.c.execute('''CREATE TABLE IF NOT EXISTS bill_history (
-                        bill_id INTEGER PRIMARY KEY,
-                        config_id INTEGER,
-                        total_bill REAL,
-                        bill_month TEXT,
-                        FOREIGN KEY (config_id) REFERENCES configurations(config_id))''')
-        
-        self.conn.commit()
+        self.db_worker = DatabaseWorker(parent=self)
+        self.db_worker.start()
+
+        self.settlement_generation = 0
+        self.pending_settlement = None  # (generation, settlement_key, config_name to store it for, or None)
+        self.settlement_cache = SettlementCache()  # Recent results, so repeat views skip the database too
+        self.settlement_signals = SettlementSignals()
+        self.settlement_signals.finished.connect(self.on_settlement_finished)
+
+        # Live updates wait until typing pauses before settling again
+        self.live_timer = QTimer(self)
+        self.live_timer.setSingleShot(True)
+        self.live_timer.setInterval(250)
+        self.live_timer.timeout.connect(self.run_live_settlement)
+
+    def closeEvent(self, event):
+        self.db_worker.stop()
+        super().closeEvent(event)
 
     def updateShowIndividuals(self, show):
         self.show_individuals = show
@@ -226,10 +442,9 @@ class BillCalculator(QWidget):
     def delete_config(self):
         config_name = self.load_dropdown.currentText()  # Get the currently selected configuration name
         if config_name:  # Ensure there is a configuration selected to delete
-            # Execute the delete operation
-            self.c.execute("DELETE FROM configurations WHERE config_name=?", (config_name,))
-            self.conn.commit()  # Commit the changes to the database
-            self.update_dropdown()  # Refresh the dropdown list to reflect the deletion
+            # Execute the delete operation, then refresh the dropdown list to reflect the deletion
+            self.db_worker.submit(BillDatabase.delete_configuration, config_name,
+                                  callback=lambda _: self.update_dropdown())
             # Optional: Notify the user or update the UI to reflect the deletion
         else:
             print("No configuration selected to delete")  # Handle the case of no selection or error
@@ -237,49 +452,39 @@ class BillCalculator(QWidget):
     def show_graph(self):
         config_name = self.load_dropdown.currentText()
         if config_name:  # Ensure there is a selected configuration
+            if self.graph_page is None:
+                self.graph_page = GraphPage(self)
+                self.stacked_layout.addWidget(self.graph_page)
             self.graph_page.update_graph(config_name)
             self.stacked_layout.setCurrentWidget(self.graph_page)
         else:
             print("No configuration selected to show graph")  # Handle case where there is no configuration selected
 
-    def fetch_monthly_data(self, config_name):
-        # Fetch monthly data for the given config_name from the database
-        # Update this query to join configurations with bill_history
-        query = """
-        SELECT bh.total_bill, strftime('%m/%Y', bh.bill_month) as formatted_month
-        FROM bill_history bh
-        JOIN configurations c ON c.config_id = bh.config_id
-        WHERE c.config_name=? 
-        ORDER BY bh.bill_month
-        """
-        self.c.execute(query, (config_name,))
-        rows = self.c.fetchall()
-
-        # Convert rows into a list of dictionaries
-        data = [{'month': row[1], 'total_bill': row[0]} for row in rows]
-        return data
-
-
-
     def show_settings(self):
         # Switch to the settings page
+        if self.settings_page is None:
+            self.settings_page = SettingsPage(self)
+            self.stacked_layout.addWidget(self.settings_page)
         self.stacked_layout.setCurrentWidget(self.settings_page)
 
     def load_settings(self):
         config_name = self.load_dropdown.currentText()
-        self.c.execute("SELECT config_id, person_names FROM configurations WHERE config_name=?", (config_name,))
-        row = self.c.fetchone()
+        self.db_worker.submit(BillDatabase.load_person_names, config_name,
+                              callback=self.on_settings_loaded, channel='load')
 
-        if row:
-            config_id, person_names = row
-            self.persons = [Person(name) for name in person_names.split(',')]
+    def on_settings_loaded(self, person_names):
+        if person_names is not None:
+            self.group = Group(person_names)
             self.updatePersonEntries()
 
     def update_dropdown(self):
         # Populate or refresh the dropdown menu with available configurations
+        self.db_worker.submit(BillDatabase.list_configurations,
+                              callback=self.on_configurations_listed, channel='dropdown')
+
+    def on_configurations_listed(self, config_names):
         self.load_dropdown.clear()
-        for row in self.c.execute('SELECT config_name FROM configurations'):
-            self.load_dropdown.addItem(row[0])
+        self.load_dropdown.addItems(config_names)
 
     def save_settings(self):
         # Define the style for the QInputDialog
@@ -318,18 +523,9 @@ class BillCalculator(QWidget):
         config_name = inputDialog.textValue()
 
         if okPressed and config_name:
-            # Calculate the total bill
-            total_bill = sum(p.val for p in self.persons)
-            # Get the current month in YYYY-MM format
-            current_month = datetime.datetime.now().strftime("%Y-%m")
-            persons_str = ','.join([person.name for person in self.persons])
-
             # Insert or update configuration
-            self.c.execute("INSERT OR REPLACE INTO configurations (config_id, config_name, person_names, show_individuals) VALUES ((SELECT config_id FROM configurations WHERE config_name = ?), ?, ?, ?)", (config_name, config_name, ','.join([p.name for p in self.persons]), self.show_individuals))
-            config_id = self.c.lastrowid
-
-            self.conn.commit()
-            self.update_dropdown()
+            self.db_worker.submit(BillDatabase.save_configuration, config_name, list(self.group.names),
+                                  self.show_individuals, callback=lambda _: self.update_dropdown())
         else:
             # Handle the case where the user did not enter a name or pressed cancel
             print("Save cancelled or no name entered.")
@@ -362,67 +558,141 @@ class BillCalculator(QWidget):
         self.total_bill_label.setAlignment(Qt.AlignCenter)
         self.main_layout.addWidget(self.total_bill_label)
 
-        # Results Area - Initialized once and always visible
-        self.scroll_area = QScrollArea(self.main_page)
-        self.scroll_area.setWidgetResizable(True)
-        self.main_layout.addWidget(self.scroll_area)
-        self.result_frame = QFrame()
-        self.result_frame.setStyleSheet("background-color: #5a2675;")
-        self.result_layout = QVBoxLayout()
-        self.result_frame.setLayout(self.result_layout)
-        self.scroll_area.setWidget(self.result_frame)
+        # Results Area - Initialized once and always visible. A list view only paints
+        # the rows that are on screen, however many lines calculate_bills returns.
+        self.results_model = ResultsModel(self.main_page)
+        self.results_view = QListView(self.main_page)
+        self.results_view.setModel(self.results_model)
+        self.results_view.setItemDelegate(RichTextDelegate(self.font_regular, self.results_view))
+        self.results_view.setUniformItemSizes(True)  # Every line is one row of the same font
+        self.results_view.setSelectionMode(QAbstractItemView.NoSelection)
+        self.results_view.setFocusPolicy(Qt.NoFocus)
+        self.results_view.setStyleSheet("QListView { background-color: #5a2675; border: none; }")
+        self.main_layout.addWidget(self.results_view)
 
         self.updatePersonEntries()  # Populate with initial or empty person entries
 
+    @trace.traced()
     def updatePersonEntries(self):
-        # Clear existing person entries from layout
-        while self.person_entries_layout.count():
-            item = self.person_entries_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-
-        # Now, self.person_entries_layout is empty, ready to add new widgets
-        for person in self.persons:
-            # Create and style the label
-            label = QLabel(f"{person.name}'s payment:")
-            label.setStyleSheet("color: white;")  # Apply white color to text
-            label.setFont(self.font_regular)  # Apply common font
-
-            # Create and style the entry box
-            payment_entry = QLineEdit()
-            payment_entry.setObjectName(f"entry_for_{person.name}")  # Set unique object name
-            payment_entry.setFont(self.font_regular)  # Apply common font
-            payment_entry.setStyleSheet("color: white; background-color: #5a2675;")  # Set text color to white and background to a darker shade
-
-            # Create a container widget to hold the label and entry side by side
-            container_widget = QWidget()
-            container_layout = QHBoxLayout(container_widget)  # Use this layout to arrange elements horizontally within the container
-            container_layout.addWidget(label)
-            container_layout.addWidget(payment_entry)
-            container_layout.setContentsMargins(0, 0, 0, 0)  # Remove margins if desired
-
-            # Add the container widget to the person entries layout
-            self.person_entries_layout.addWidget(container_widget)
+        # Reconcile the entry rows with self.group. Rows are keyed by name: rows for
+        # people who are gone go back to a pool of hidden spares, new people take a row
+        # from the pool (or get a new one), and rows for everyone else are left alone
+        # along with whatever has been typed into them.
+        # Repaint once at the end rather than after every row that moves
+        self.main_page.setUpdatesEnabled(False)
+        try:
+            self._reconcile_person_rows(list(self.group.names))
+        finally:
+            self.main_page.setUpdatesEnabled(True)
+        if self.live_updates:
+            self.reset_ledger()
+
+    def _reconcile_person_rows(self, names):
+        wanted = set(names)
+        leaving = [name for name in self.row_order if name not in wanted]
+        arriving = [name for name in names if name not in self.entry_rows]
+
+        # A row whose person left is handed straight to a new person where it stands,
+        # so swapping one configuration for another of the same size moves nothing
+        position = {name: index for index, name in enumerate(self.row_order)}
+        for old_name, new_name in zip(leaving, arriving):
+            row = self.entry_rows.pop(old_name)
+            del self.entry_by_name[old_name]
+            row.assign(new_name)
+            self.entry_rows[new_name] = row
+            self.entry_by_name[new_name] = row.entry
+            self.row_order[position[old_name]] = new_name
+
+        for name in leaving[len(arriving):]:
+            self.release_person_row(name)
+        self.row_order = [name for name in self.row_order if name in wanted]
+
+        if self.row_order == [name for name in names if name in self.entry_rows]:
+            # Existing rows are already in order: only insert the new ones
+            for index, name in enumerate(names):
+                if name not in self.entry_rows:
+                    self.place_person_row(index, self.acquire_person_row(name))
+        else:
+            # Reordered: lay every row out again, still without recreating any
+            for name in self.row_order:
+                self.person_entries_layout.removeWidget(self.entry_rows[name].container)
+            for index, name in enumerate(names):
+                self.place_person_row(index, self.entry_rows.get(name) or self.acquire_person_row(name))
+        self.row_order = names
+
+    def acquire_person_row(self, name):
+        row = self.spare_rows.pop() if self.spare_rows else PersonEntryRow(self.font_regular, self.on_entry_edited)
+        row.assign(name)
+        self.entry_rows[name] = row
+        self.entry_by_name[name] = row.entry
+        return row
+
+    def place_person_row(self, index, row):
+        self.person_entries_layout.insertWidget(index, row.container)
+        row.container.show()  # Rows coming back from the pool were hidden
+
+    def release_person_row(self, name):
+        row = self.entry_rows.pop(name)
+        del self.entry_by_name[name]
+        self.person_entries_layout.removeWidget(row.container)
+        row.container.hide()
+        self.spare_rows.append(row)
+
+    def setLiveUpdates(self, enabled):
+        self.live_updates = enabled
+        if enabled:
+            self.reset_ledger()
+        else:
+            self.live_timer.stop()
+
+    def reset_ledger(self):
+        # Rebuild the ledger from what is currently typed; only needed when live
+        # updates are switched on or the people change, not on every keystroke
+        self.ledger = LiveLedger(self.row_order)
+        self.invalid_entries = set()
+        for name in self.row_order:
+            self.on_entry_edited(name, self.entry_by_name[name].text())
+
+    def on_entry_edited(self, name, text):
+        if not self.live_updates:
+            return
+        try:
+            # Only this person's payment changed, so the total is adjusted rather than re-summed
+            self.ledger.set_amount(name, parse_cents(text) if text else 0)
+        except (ValueError, OverflowError):  # OverflowError: too large for the ledger's int64 column
+            self.invalid_entries.add(name)
+            self.total_bill_label.setText("Invalid input. Please enter numeric values.")
+            return
+        self.invalid_entries.discard(name)
+        if not self.invalid_entries:
+            self.total_bill_label.setText(f"Total Bill: ${format_cents(self.ledger.total)}")
+        self.live_timer.start()  # (Re)start the debounce
+
+    def run_live_settlement(self):
+        # Nothing is read from or written to the database here; that still happens on Calculate
+        if self.invalid_entries:
+            return
+        self.start_settlement(self.ledger.persons(), store=False)
 
     def on_calculate(self):
-        print("entering on_calculate")
         try:
-            total_bill = 0  # Initialize total bill
+            total_bill = 0  # Initialize total bill, in cents
 
             # Reset all persons' values
-            for person in self.persons:
-                person.val = 0  # Default to 0 in case of invalid or no input
+            self.group.clear_amounts()  # Default to 0 in case of invalid or no input
 
             # Update each person's payment from corresponding QLineEdit and calculate total bill
-            for person in self.persons:
-                payment_entry = self.findChild(QLineEdit, f"entry_for_{person.name}")
-                if payment_entry and payment_entry.text():  # Ensure it's found and not empty
-                    payment = float(payment_entry.text())
-                    person.val = payment  # Convert text to float and assign to person.val
-                    total_bill += payment  # Add to total bill
+            with trace.span('parse_input', people=len(self.group)):
+                amounts = self.group.amounts
+                for i, name in enumerate(self.group.names):
+                    payment_entry = self.entry_by_name.get(name)
+                    if payment_entry and payment_entry.text():  # Ensure it's found and not empty
+                        payment = parse_cents(payment_entry.text())
+                        amounts[i] = payment  # Convert text to cents and store it in the group's column
+                        total_bill += payment  # Add to total bill
 
             # Display total bill
-            self.total_bill_label.setText(f"Total Bill: ${total_bill:.2f}")
+            self.total_bill_label.setText(f"Total Bill: ${format_cents(total_bill)}")
 
             # Ensure there is a selected configuration
             config_name = self.load_dropdown.currentText()
@@ -431,39 +701,63 @@ class BillCalculator(QWidget):
                 if total_bill > 0:
                     self.update_total_bill_in_database(total_bill, config_name)
                     
-        except ValueError:
+        except (ValueError, OverflowError):  # OverflowError: too large for the group's int64 column
             self.total_bill_label.setText("Invalid input. Please enter numeric values.")
             return  # Return early if any conversion fails
 
         # Display total bill
-        self.total_bill_label.setText(f"Total Bill: ${total_bill:.2f}")
+        self.total_bill_label.setText(f"Total Bill: ${format_cents(total_bill)}")
+
+        self.start_settlement(self.group.snapshot())  # The settlement runs while the entries stay editable
+
+    def start_settlement(self, persons, store=True):
+        # Shows the settlement for a snapshot of the payments: straight from the in-memory
+        # cache if it was worked out recently, otherwise from the database's settlement
+        # cache (when store is set), otherwise by running calculate_bills on the thread
+        # pool. A newer settlement makes any still in progress stale.
+        self.settlement_generation += 1
+        generation = self.settlement_generation
+        key = settlement_key(persons, self.show_individuals)
+        self.pending_settlement = (generation, key, self.load_dropdown.currentText() if store else None)
+
+        results = self.settlement_cache.get(key)
+        if results is not None:
+            self.display_results(results.split('\n'))
+        elif store:
+            self.db_worker.submit(BillDatabase.load_settlement, key, channel='settlement',
+                                  callback=lambda stored: self.on_stored_settlement(generation, persons, stored))
+        else:
+            self.run_settlement(generation, persons)
 
-        # Pass the show_individuals attribute to the calculate_bills function
-        results = calculate_bills(self.persons, self.show_individuals)
+    def on_stored_settlement(self, generation, persons, results):
+        if generation != self.settlement_generation:
+            return
+        if results is None:
+            self.run_settlement(generation, persons)
+            return
+        self.settlement_cache.put(self.pending_settlement[1], results)
         self.display_results(results.split('\n'))
 
-        print("leaving on_calculate")
+    def run_settlement(self, generation, persons):
+        # Pass the show_individuals attribute to the calculate_bills function
+        QThreadPool.globalInstance().start(SettlementTask(
+            generation, persons, self.show_individuals, self.settlement_signals))
+
+    def on_settlement_finished(self, generation, results):
+        if generation != self.settlement_generation:
+            return
+        _, key, config_name = self.pending_settlement
+        self.settlement_cache.put(key, results)
+        if config_name is not None:
+            self.db_worker.submit(BillDatabase.store_settlement, key, results, config_name or None)
+        self.display_results(results.split('\n'))
 
     def update_total_bill_in_database(self, total_bill, config_name):
         if config_name and total_bill > 0:  # Ensure there is a config selected and total bill is greater than 0
-            # Fetch the configuration ID from the configurations table
-            self.c.execute("SELECT config_id FROM configurations WHERE config_name=?", (config_name,))
-            config_row = self.c.fetchone()
-            
-            if config_row:  # Ensure configuration is found
-                config_id = config_row[0]
-                
-                # Check if an entry for this month and config_id already exists in bill_history
-                self.c.execute("SELECT * FROM bill_history WHERE config_id=? AND bill_month=?", (config_id, self.previous_month_year))
-                if self.c.fetchone():
-                    # Update the existing entry in bill_history
-                    self.c.execute("UPDATE bill_history SET total_bill=? WHERE config_id=? AND bill_month=?", (total_bill, config_id, self.previous_month_year))
-                else:
-                    # Insert a new entry into bill_history only if total_bill is greater than 0
-                    self.c.execute("INSERT INTO bill_history (config_id, total_bill, bill_month) VALUES (?, ?, ?)", (config_id, total_bill, self.previous_month_year))
-                self.conn.commit()
-            else:
-                print("No existing configuration found for this name. Please save this as a new configuration or choose an existing one.")
+            # Store each person's payment alongside the total so per-person history can be queried
+            payments = self.group.snapshot()  # Read like a {name: cents} dict on the database thread
+            self.db_worker.submit(BillDatabase.record_bill, config_name, self.bill_month, total_bill, payments,
+                                  callback=self.on_bill_recorded)
         else:
             # Handle the case where total_bill is 0 or no config_name is provided
             if total_bill == 0:
@@ -472,39 +766,21 @@ class BillCalculator(QWidget):
                 print("No configuration name provided.")
 
 
+    def on_bill_recorded(self, found):
+        if not found:
+            print("No existing configuration found for this name. Please save this as a new configuration or choose an existing one.")
+
     # In the BillCalculator class
     def insert_or_update_history(self, config_name, month, total_bill):
-    # Fetch the configuration ID first
-        self.c.execute("SELECT config_id FROM configurations WHERE config_name=?", (config_name,))
-        config = self.c.fetchone()
-        
-        if config:
-            config_id = config[0]
-            # Check if an entry for this month and config_id already exists in bill_history
-            self.c.execute("SELECT * FROM bill_history WHERE config_id=? AND bill_month=?", (config_id, month))
-            if self.c.fetchone():
-                # Entry exists, update it
-                self.c.execute("UPDATE bill_history SET total_bill=? WHERE config_id=? AND bill_month=?", (total_bill, config_id, month))
-            else:
-                # Entry does not exist, insert a new record
-                self.c.execute("INSERT INTO bill_history (config_id, total_bill, bill_month) VALUES (?, ?, ?)", (config_id, total_bill, month))
-            self.conn.commit()
-        else:
-            print(f"Configuration with name '{config_name}' does not exist.")
+        def on_history_recorded(found):
+            if not found:
+                print(f"Configuration with name '{config_name}' does not exist.")
+        self.db_worker.submit(BillDatabase.insert_or_update_history, config_name, month, total_bill,
+                              callback=on_history_recorded)
 
 
     def display_results(self, results):
-        for i in reversed(range(self.result_layout.count())):
-            widget = self.result_layout.itemAt(i).widget()
-            if widget:
-                widget.setParent(None)
-
-        for line in results:
-            label = QLabel()
-            label.setText(line)  # Set the text as HTML
-            label.setStyleSheet("color: #ffffff; text-align: left;")
-            label.setFont(self.font_regular)
-            self.result_layout.addWidget(label)
+        self.results_model.set_results(results)
 
     def show_main_page(self):
         # Switch to the main page
@@ -512,32 +788,70 @@ class BillCalculator(QWidget):
 
     def updatePersons(self, data, action):
         if action == 'add':
-            self.persons.append(data)
+            if data.name in self.entry_rows:
+                print(f"{data.name} is already in this configuration.")
+                return self.group
+            self.group.append(data.name, data.val)
         elif action == 'remove':
-            self.persons = [p for p in self.persons if p.name != data]
+            self.group.remove(data)
         self.updatePersonEntries()  # Refresh the UI to reflect changes
-        return self.persons  # returning the modified list might be helpful
+        return self.group  # returning the modified group might be helpful
 
     # Separate method to get person names for clarity and reuse
     def getPersonNames(self):
-        return [p.name for p in self.persons]
+        return list(self.group.names)
+
+
+def fetch_series(db, config_name, person_name=None):
+    # (dates, dollar values, averages) NumPy arrays for the graph page; runs on the
+    # database thread, as does the conversion. dates are matplotlib date numbers for the
+    # first day of each month. Rows come back from the database already in
+    # chronological order. For the total, averages is the precomputed (3-month,
+    # 12-month) rolling averages in dollars; a person's payments have none.
+    import numpy
+    from matplotlib import dates as mdates
+    if person_name:
+        data = db.fetch_person_history(config_name, person_name)
+        values = numpy.array([d['amount'] for d in data], dtype=float) / 100
+        averages = None
+    else:
+        data = db.fetch_summary(config_name)
+        values = numpy.array([d['total_bill'] for d in data], dtype=float) / 100
+        averages = (numpy.array([d['avg_3'] for d in data], dtype=float) / 100,
+                    numpy.array([d['avg_12'] for d in data], dtype=float) / 100)
+    dates = mdates.date2num(numpy.array([d['month'] for d in data], dtype='datetime64[M]'))
+    return dates, values, averages
 
 
 class GraphPage(QWidget):
     def __init__(self, bill_calculator, parent=None):
         super().__init__(parent)
         self.bill_calculator = bill_calculator
+        self.config_name = None
         self.layout = QVBoxLayout(self)
-        self.figure = plt.figure(facecolor='none')  # Set background as transparent
+
+        # Dropdown to switch between the configuration's total and one person's payments
+        self.series_dropdown = QComboBox()
+        self.series_dropdown.setFont(bill_calculator.font_regular)
+        self.series_dropdown.setProperty('role', 'boxed')
+        self.series_dropdown.currentIndexChanged.connect(self.on_series_changed)
+        self.layout.addWidget(self.series_dropdown)
+
+        # matplotlib is only imported once the graph page is built, keeping it off the core import path
+        from matplotlib import dates as mdates
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        self.figure = Figure(facecolor='none')  # Set background as transparent
         self.canvas = FigureCanvas(self.figure)
+        self.canvas.draw = trace.traced('GraphPage.canvas.draw')(self.canvas.draw)  # draw_idle ends up here
         self.canvas.setStyleSheet("background-color:transparent;")  # Ensure the canvas is transparent
+        self.canvas.mpl_connect('resize_event', self.on_canvas_resized)
         self.layout.addWidget(self.canvas)
 
-    def update_graph(self, config_name):
-        
-        self.figure.clear()
+        # The axes and artists are created and styled once; redraws only swap their data
+        self.ax = self.figure.add_subplot(111, facecolor='none')
+        ax = self.ax
         # Set the axes to be transparent and lines to be white
-        ax = self.figure.add_subplot(111, facecolor='none')
         ax.spines['bottom'].set_color('white')
         ax.spines['top'].set_color('white')
         ax.spines['right'].set_color('white')
@@ -548,35 +862,137 @@ class GraphPage(QWidget):
         ax.yaxis.label.set_color('white')
         ax.title.set_color('white')
 
+        # Dates are plotted as numbers, so the locator picks a handful of ticks (months,
+        # years or decades) however long the history, instead of one label per month
+        locator = mdates.AutoDateLocator()
+        ax.xaxis.set_major_locator(locator)
+        ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+        ax.xaxis.get_offset_text().set_color('white')
+
         # Add grid lines to make it easier to read
         ax.grid(color='gray', linestyle='-', linewidth=0.5, alpha=0.7)  # Customize as needed
 
-        # Fetch data from the database
-        data = self.bill_calculator.fetch_monthly_data(config_name)
+        ax.set_xlabel("Month", fontdict={'fontname': 'MS Reference Sans Serif', 'size': 20, 'color': 'white'})
+        self.ylabel = ax.set_ylabel("", fontdict={'fontname': 'MS Reference Sans Serif', 'size': 20, 'color': 'white'})
+        self.title = ax.set_title("", fontdict={'fontname': 'MS Reference Sans Serif', 'size': 24, 'color': 'white'})
+
+        self.line, = ax.plot([], [], marker='o', color='white', linewidth=2)  # Line is white and slightly thicker
+        # Rolling averages drawn over the total
+        self.avg_3_line, = ax.plot([], [], color='#c9a8f1', linestyle='--', linewidth=1.5, label='3-month average')
+        self.avg_12_line, = ax.plot([], [], color='#f1c9a8', linestyle=':', linewidth=1.5, label='12-month average')
+        self.legend = ax.legend(handles=[self.avg_3_line, self.avg_12_line], loc='upper left',
+                                facecolor='none', edgecolor='white', labelcolor='white')
+        self.no_data_text = ax.text(0.5, 0.5, 'No data available', horizontalalignment='center',
+                                    verticalalignment='center', color='white', transform=ax.transAxes, visible=False)
+
+        # (config_name, person_name or None) -> fetch_series result, dropped
+        # whenever that configuration's history is written. cache_versions guards
+        # against storing a fetch that was already in flight when that happened.
+        self.series_cache = {}
+        self.cache_versions = {}
+        self.displayed_key = None
+        self.displayed_series = None
+        self.displayed_budget = None  # Points the displayed series was downsampled to
+        bill_calculator.db_worker.history_changed.connect(self.invalidate)
+
+    def invalidate(self, config_name):
+        self.cache_versions[config_name] = self.cache_versions.get(config_name, 0) + 1
+        for key in [key for key in self.series_cache if key[0] == config_name]:
+            del self.series_cache[key]
 
-        # Ensure data is sorted by the 'month' field, which requires converting the month strings to datetime objects
-        if data:
-            # Convert 'month' strings to datetime objects for sorting
-            data = sorted(data, key=lambda x: datetime.datetime.strptime(x['month'], "%m/%Y"))
+    def update_graph(self, config_name):
+        # Called when the graph page is opened for a configuration: list its people
+        # and draw the total
+        self.config_name = config_name
+        self.series_dropdown.blockSignals(True)
+        self.series_dropdown.clear()
+        self.series_dropdown.addItem("Total")
+        self.series_dropdown.blockSignals(False)
+        self.bill_calculator.db_worker.submit(BillDatabase.load_person_names, config_name,
+                                              callback=self.on_people_loaded, channel='graph_people')
+        self.draw_series(config_name)
+
+    def on_people_loaded(self, person_names):
+        self.series_dropdown.blockSignals(True)
+        self.series_dropdown.addItems(person_names or [])
+        self.series_dropdown.blockSignals(False)
+
+    def on_series_changed(self, index):
+        if self.config_name:
+            self.draw_series(self.config_name, self.series_dropdown.itemText(index) if index > 0 else None)
+
+    def draw_series(self, config_name, person_name=None):
+        key = (config_name, person_name)
+        series = self.series_cache.get(key)
+        if series is not None:
+            # A fetch still running for an earlier choice must not draw over this one
+            self.bill_calculator.db_worker.cancel('graph')
+            self.render_series(key, series)
+            return
 
-            # Extract the sorted data
-            months = [d['month'] for d in data]
-            total_bills = [d['total_bill'] for d in data]
+        # Fetch on the database thread; a newer request on the 'graph' channel
+        # (e.g. flipping quickly between people) makes this one stale
+        version = self.cache_versions.get(config_name, 0)
 
-            # Plotting the data with specified styles
-            ax.plot(months, total_bills, marker='o', color='white', linewidth=2)  # Line is white and slightly thicker
-            ax.set_title(f"Monthly Total Bill for {config_name}", 
-                     fontdict={'fontname': 'MS Reference Sans Serif', 'size': 24, 'color': 'white'})
-            ax.set_xlabel("Month", fontdict={'fontname': 'MS Reference Sans Serif', 'size': 20, 'color': 'white'})
-            ax.set_ylabel("Total Bill ($)", fontdict={'fontname': 'MS Reference Sans Serif', 'size': 20, 'color': 'white'})
+        def on_series_fetched(series):
+            if self.cache_versions.get(config_name, 0) == version:
+                self.series_cache[key] = series
+            self.render_series(key, series)
 
-            # Rotate x-axis labels to prevent overlap
-            plt.setp(ax.get_xticklabels(), rotation=45, ha="right", rotation_mode="anchor", color='white')
+        self.bill_calculator.db_worker.submit(fetch_series, config_name, person_name,
+                                              callback=on_series_fetched, channel='graph')
 
+    @trace.traced()
+    def render_series(self, key, series):
+        config_name, person_name = key
+        if person_name:
+            self.title.set_text(f"Monthly Payments by {person_name}")
+            self.ylabel.set_text("Payment ($)")
         else:
-            ax.text(0.5, 0.5, 'No data available', horizontalalignment='center', verticalalignment='center', color='white')
-
-        self.canvas.draw()
+            self.title.set_text(f"Monthly Total Bill for {config_name}")
+            self.ylabel.set_text("Total Bill ($)")
+
+        # Only touch the lines and limits when the data or the width changed
+        budget = self.point_budget()
+        if series is not self.displayed_series or budget != self.displayed_budget:
+            self.displayed_key, self.displayed_series, self.displayed_budget = key, series, budget
+            dates, values, averages = series
+            has_data = len(dates) > 0
+            line_dates, line_values = downsampled(dates, values, budget)
+            self.line.set_data(line_dates, line_values)
+            self.line.set_marker('o' if len(line_dates) == len(dates) else 'None')  # Markers only for real points
+            self.line.set_visible(has_data)
+            show_averages = has_data and averages is not None
+            for line, average in zip((self.avg_3_line, self.avg_12_line), averages or ((), ())):
+                line.set_data(*(downsampled(dates, average, budget) if show_averages else ([], [])))
+                line.set_visible(show_averages)
+            self.legend.set_visible(show_averages)
+            self.no_data_text.set_visible(not has_data)
+            self.ax.tick_params(axis='x', labelbottom=has_data)  # No dates left over from the last series
+            self.ax.xaxis.get_offset_text().set_visible(has_data)
+            if has_data:
+                self.ax.relim()
+                self.ax.autoscale_view()
+
+        self.canvas.draw_idle()
+
+    def point_budget(self):
+        # No more points are drawn than the axes have pixels across
+        return int(self.ax.get_window_extent().width)
+
+    def on_canvas_resized(self, event):
+        if self.displayed_series is not None and self.point_budget() != self.displayed_budget:
+            self.render_series(self.displayed_key, self.displayed_series)
+
+
+def downsampled(xs, ys, budget):
+    # (xs, ys) cut down to at most budget points by largest-triangle-three-buckets,
+    # which keeps the peaks a plain stride would skip
+    from fairshare.downsample import lttb
+    kept = lttb(xs, ys, budget)
+    if len(kept) == len(xs):
+        return xs, ys
+    return xs[kept], ys[kept]
 
 
 class SettingsPage(QWidget):
@@ -592,10 +1008,6 @@ class SettingsPage(QWidget):
         self.layout.setAlignment(Qt.AlignTop)
         self.font_regular, self.font_bold = add_fonts()
 
-        lineEditStyle = "QLineEdit { color: white; border: 1px solid white; background-color: #5a2675; padding: 6px; }"
-        comboBoxStyle = "QComboBox { color: white; border: 1px solid white; background-color: #5a2675; padding: 6px; combobox-popup: 0; }"
-        buttonStyle = "QPushButton { color: white; border: 1px solid white; background-color: #5a2675; padding: 6px; }"
-
         # Settings Title
         title_label = QLabel("Settings")
         title_label.setFont(self.font_bold)
@@ -609,10 +1021,10 @@ class SettingsPage(QWidget):
         self.addPersonLineEdit = QLineEdit()
         self.addPersonLineEdit.setPlaceholderText("Enter Name to Add")
         self.addPersonLineEdit.setFont(self.font_regular)
-        self.addPersonLineEdit.setStyleSheet(lineEditStyle)
+        self.addPersonLineEdit.setProperty('role', 'field')
         self.addPersonButton = QPushButton("Add Person")
         self.addPersonButton.setFont(self.font_regular)
-        self.addPersonButton.setStyleSheet(buttonStyle)
+        self.addPersonButton.setProperty('role', 'boxed')
         self.addPersonButton.clicked.connect(self.addPerson)
         addPersonLayout.addWidget(self.addPersonLineEdit)
         addPersonLayout.addWidget(self.addPersonButton)
@@ -622,10 +1034,10 @@ class SettingsPage(QWidget):
         removePersonLayout = QHBoxLayout()
         self.removePersonComboBox = QComboBox()
         self.removePersonComboBox.setFont(self.font_regular)
-        self.removePersonComboBox.setStyleSheet(comboBoxStyle)
+        self.removePersonComboBox.setProperty('role', 'field')
         self.removePersonButton = QPushButton("Remove Person")
         self.removePersonButton.setFont(self.font_regular)
-        self.removePersonButton.setStyleSheet(buttonStyle)
+        self.removePersonButton.setProperty('role', 'boxed')
         self.removePersonButton.clicked.connect(self.removePerson)
         removePersonLayout.addWidget(self.removePersonComboBox)
         removePersonLayout.addWidget(self.removePersonButton)
@@ -634,17 +1046,38 @@ class SettingsPage(QWidget):
         # Add Bill History Button
         self.addBillHistoryButton = QPushButton("Add Bill History")
         self.addBillHistoryButton.setFont(self.font_regular)
-        self.addBillHistoryButton.setStyleSheet(buttonStyle)
+        self.addBillHistoryButton.setProperty('role', 'boxed')
         self.addBillHistoryButton.clicked.connect(self.addBillHistory)
         self.layout.addWidget(self.addBillHistoryButton)
 
+        # Import/Export Bill History Buttons
+        historyFileLayout = QHBoxLayout()
+        self.importHistoryButton = QPushButton("Import History")
+        self.importHistoryButton.setFont(self.font_regular)
+        self.importHistoryButton.setProperty('role', 'boxed')
+        self.importHistoryButton.clicked.connect(self.importBillHistory)
+        self.exportHistoryButton = QPushButton("Export History")
+        self.exportHistoryButton.setFont(self.font_regular)
+        self.exportHistoryButton.setProperty('role', 'boxed')
+        self.exportHistoryButton.clicked.connect(self.exportBillHistory)
+        historyFileLayout.addWidget(self.importHistoryButton)
+        historyFileLayout.addWidget(self.exportHistoryButton)
+        self.layout.addLayout(historyFileLayout)
+
         # Show/Hide Individual Values Button
-        self.toggle_individuals_btn = QPushButton("Not Showing Individual Values")
+        self.toggle_individuals_btn = QPushButton("Showing Individual Values" if self.bill_calculator.show_individuals else "Not Showing Individual Values")
         self.toggle_individuals_btn.setFont(self.font_regular)
-        self.toggle_individuals_btn.setStyleSheet(buttonStyle)
+        self.toggle_individuals_btn.setProperty('role', 'boxed')
         self.toggle_individuals_btn.clicked.connect(self.toggleShowIndividuals)
         self.layout.addWidget(self.toggle_individuals_btn)
 
+        # Live Updates Button
+        self.toggle_live_btn = QPushButton("Live Updates Off")
+        self.toggle_live_btn.setFont(self.font_regular)
+        self.toggle_live_btn.setProperty('role', 'boxed')
+        self.toggle_live_btn.clicked.connect(self.toggleLiveUpdates)
+        self.layout.addWidget(self.toggle_live_btn)
+
         self.populatePersonComboBox()  # Initial population of the ComboBox
 
     # Method to populate the ComboBox with current persons
@@ -674,6 +1107,11 @@ class SettingsPage(QWidget):
         btn_text = "Showing Individual Values" if self.bill_calculator.show_individuals else "Not Showing Individual Values"
         self.toggle_individuals_btn.setText(btn_text)
 
+    def toggleLiveUpdates(self):
+        self.bill_calculator.setLiveUpdates(not self.bill_calculator.live_updates)
+        btn_text = "Live Updates On" if self.bill_calculator.live_updates else "Live Updates Off"
+        self.toggle_live_btn.setText(btn_text)
+
     # Within the SettingsPage class
     def addBillHistory(self):
         config_name = self.bill_calculator.load_dropdown.currentText()
@@ -727,14 +1165,57 @@ class SettingsPage(QWidget):
 
         # Execute the bill dialog
         okPressedBill = billDialog.exec_()
-        total_bill = billDialog.doubleValue()
+        total_bill = parse_cents(billDialog.doubleValue())
 
         if okPressedMonth and okPressedBill:
+            try:
+                month = month_key(month)
+            except ValueError as e:
+                print(e)
+                return
             # Now insert or update the data in the database
             self.bill_calculator.insert_or_update_history(config_name, month, total_bill)
         else:
             print("Operation cancelled or no data entered.")
 
+    def importBillHistory(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Import Bill History", "", HISTORY_FILE_FILTER)
+        if not path:
+            return
+
+        def on_imported(result):
+            read, written = result
+            print(f"Imported {written} of {read} month(s) from {path}")
+        # A bad record anywhere in the file leaves the history untouched and is reported as a database error
+        self.bill_calculator.db_worker.submit(import_history_file, path, callback=on_imported)
+
+    def exportBillHistory(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Bill History", "history.csv", HISTORY_FILE_FILTER)
+        if not path:
+            return
+
+        def on_exported(count):
+            print(f"Exported {count} month(s) to {path}")
+        self.bill_calculator.db_worker.submit(export_history_file, path, callback=on_exported)
+
+
+HISTORY_FILE_FILTER = "Bill history (*.csv *.jsonl *.ndjson);;All files (*)"
+
+
+def import_history_file(db, path):
+    # Runs on the database thread, as one transaction. The file code is only imported
+    # when it is first used, keeping it off the startup path.
+    from fairshare import batch, history_io
+    with open(path, newline='') as f:
+        return history_io.import_history(db, f, batch.guess_format(path))
+
+
+def export_history_file(db, path):
+    # Every configuration's history, streamed to path from the database thread
+    from fairshare import batch, history_io
+    with open(path, 'w', newline='') as f:
+        return history_io.export_history(db, f, batch.guess_format(path))
+
 
 def main():
     app = QApplication(sys.argv)
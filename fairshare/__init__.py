@@ -0,0 +1,23 @@
+"""Headless core of Bill's Bill Calculator.
+
+Nothing in this package imports Qt or matplotlib, so scripts and the
+command line (``python -m fairshare``) can settle bills and read or write
+the history database without a display.
+"""
+from .cache import SettlementCache, cached_calculate_bills, settlement_key
+from .database import DEFAULT_DB_PATH, BillDatabase
+from .group import Group, PersonView
+from .ledger import LiveLedger
+from .money import format_cents, parse_cents, split_cents
+from .months import add_months, current_month, format_month, month_key, previous_month
+from .settlement import Person, calculate_bills, group_balances, settle_balances, settle_group
+
+__all__ = [
+    'DEFAULT_DB_PATH', 'BillDatabase',
+    'Group', 'PersonView',
+    'SettlementCache', 'cached_calculate_bills', 'settlement_key',
+    'LiveLedger',
+    'format_cents', 'parse_cents', 'split_cents',
+    'add_months', 'current_month', 'format_month', 'month_key', 'previous_month',
+    'Person', 'calculate_bills', 'group_balances', 'settle_balances', 'settle_group',
+]
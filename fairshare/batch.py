@@ -0,0 +1,201 @@
+"""Streaming batch settlement for many groups read from CSV or JSONL.
+
+Input is one record per person payment: ``group``, ``name`` and ``amount``
+(in dollars, e.g. ``12.34``). A name that appears more than once in a group
+is one person who paid more than once; their amounts are added up (see
+settlement.group_balances). Records for the same group must be
+contiguous, which lets each group be settled and written out as soon as
+the next one starts, so memory use stays flat however large the input is.
+With jobs > 1 the parent process only splits the input into groups; worker
+processes parse, settle and format them (see parallel.py), and the results
+are written out in input order, byte for byte as a serial run would.
+"""
+import csv
+import io
+import itertools
+import json
+import sys
+import time
+
+from . import parallel, trace
+from .group import columns
+from .money import format_cents, parse_cents
+from .settlement import Person, settle_group
+
+FORMATS = ('csv', 'jsonl')
+OUTPUT_FIELDS = ('group', 'from', 'to', 'amount')
+
+
+def guess_format(path, default='csv'):
+    if path and path.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    if path and path.endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def read_rows(stream, fmt):
+    # Yields (line_number, group, name, amount) tuples, one per input record, with
+    # the amount as read
+    if fmt == 'csv':
+        reader = csv.reader(stream)
+        header = next(reader, [])
+        rows = ((reader.line_num, dict(zip(header, values))) for values in reader if values)  # Cheaper than csv.DictReader
+    elif fmt == 'jsonl':
+        rows = ((line_number, line) for line_number, line in enumerate(stream, 1) if line.strip())
+    else:
+        raise ValueError(f"Unknown format: {fmt!r}")
+
+    for line_number, row in rows:
+        try:
+            if fmt == 'jsonl':
+                row = json.loads(row)  # JSONDecodeError is a ValueError
+            group, name, amount = str(row['group']), str(row['name']), row['amount']
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Bad record on line {line_number}: {e}") from None
+        yield line_number, group, name, amount
+
+
+def parse_amount(line_number, amount):
+    try:
+        return parse_cents(amount)
+    except ValueError as e:
+        raise ValueError(f"Bad record on line {line_number}: {e}") from None
+
+
+def read_records(stream, fmt):
+    # Yields (group, name, cents) tuples, one per input record
+    for line_number, group, name, amount in read_rows(stream, fmt):
+        yield group, name, parse_amount(line_number, amount)
+
+
+def iter_groups(records):
+    # Yields (group, [Person, ...]) for each run of records sharing a group
+    for group, rows in itertools.groupby(records, key=lambda record: record[0]):
+        yield group, [Person(name, cents) for _, name, cents in rows]
+
+
+def iter_raw_groups(rows):
+    # Yields (group, first_line_number, names, amounts as read) for each run of
+    # read_rows rows sharing a group. This is what run_batch sends to its workers,
+    # which parse the amounts themselves so the parent process only has to split
+    # the input.
+    for group, run in itertools.groupby(rows, key=lambda row: row[1]):
+        run = list(run)
+        yield group, run[0][0], tuple(row[2] for row in run), tuple(row[3] for row in run)
+
+
+def settle_groups(groups, minimize_transfers=False):
+    # Yields (group, transfers) for each group, in input order
+    for group, persons in groups:
+        yield group, settle_group(*columns(persons), minimize_transfers=minimize_transfers)[1]
+
+
+class SettlementWriter:
+    # key_fields names the columns a group's key is written to; with more than one
+    # the key must be a tuple of that many values
+    def __init__(self, stream, fmt, key_fields=('group',), header=True):
+        self.stream = stream
+        self.fmt = fmt
+        self.key_fields = tuple(key_fields)
+        self.fields = self.key_fields + OUTPUT_FIELDS[1:]
+        if fmt == 'csv':
+            self.writer = csv.writer(stream)
+            if header:
+                self.writer.writerow(self.fields)
+        elif fmt != 'jsonl':
+            raise ValueError(f"Unknown format: {fmt!r}")
+
+    def write(self, group, transfers):
+        key = tuple(group) if len(self.key_fields) > 1 else (group,)
+        for debtor_name, creditor_name, pay_amount in transfers:
+            row = key + (debtor_name, creditor_name, format_cents(pay_amount))
+            if self.fmt == 'csv':
+                self.writer.writerow(row)
+            else:
+                self.stream.write(json.dumps(dict(zip(self.fields, row))) + '\n')
+
+
+def format_results(results, fmt, key_fields):
+    # (key, transfers) pairs -> (group_count, the text a SettlementWriter would write for them)
+    output = io.StringIO()
+    writer = SettlementWriter(output, fmt, key_fields, header=False)
+    group_count = 0
+    for key, transfers in results:
+        writer.write(key, transfers)
+        group_count += 1
+    return group_count, output.getvalue()
+
+
+def settle_raw_chunk(chunk, minimize_transfers, fmt, key_fields):
+    # Runs in a worker: parses and settles iter_raw_groups groups and returns format_results
+    items = [(group, names, tuple(parse_amount(first_line + i, amount) for i, amount in enumerate(amounts)))
+             for group, first_line, names, amounts in chunk]
+    return format_results(parallel.settle_chunk(items, minimize_transfers), fmt, key_fields)
+
+
+def resettle_chunk(config_names, path, start, end, minimize_transfers, fmt, key_fields):
+    # Runs in a worker: parallel.resettle_chunk, formatted
+    return format_results(parallel.resettle_chunk(config_names, path, start, end, minimize_transfers),
+                          fmt, key_fields)
+
+
+def write_chunks(writer, formatted):
+    # Writes (group_count, text) results in order, yielding each group_count
+    for group_count, text in formatted:
+        writer.stream.write(text)
+        yield group_count
+
+
+def resettle(db, output_stream, output_format='jsonl', start=None, end=None, config_name=None,
+             minimize_transfers=False, jobs=1):
+    # Writes parallel.resettle_history's transfers to output_stream, with config and
+    # month columns in place of group. With jobs > 1 (None: one per CPU) the workers
+    # format the output as well. Returns the number of months settled.
+    writer = SettlementWriter(output_stream, output_format, key_fields=('config', 'month'))
+    if jobs == 1:
+        month_count = 0
+        for key, transfers in parallel.resettle_history(db, start, end, config_name, minimize_transfers, 1):
+            writer.write(key, transfers)
+            month_count += 1
+        return month_count
+    formatted = parallel.map_chunks(resettle_chunk, parallel.resettle_configs(db, config_name), jobs,
+                                    parallel.CONFIGS_PER_TASK, db.path, start, end, minimize_transfers,
+                                    output_format, writer.key_fields)
+    return sum(write_chunks(writer, formatted))
+
+
+@trace.traced()
+def run_batch(input_stream, output_stream, input_format='csv', output_format='jsonl',
+              minimize_transfers=False, progress_every=0, log=sys.stderr, jobs=1):
+    # Settles every group in input_stream, writing transfers to output_stream as it goes.
+    # jobs > 1 settles on that many worker processes, None on one per CPU.
+    # Returns (group_count, elapsed_seconds).
+    writer = SettlementWriter(output_stream, output_format)
+
+    def write_serial():
+        records = read_records(input_stream, input_format)
+        for group, transfers in settle_groups(iter_groups(records), minimize_transfers):
+            writer.write(group, transfers)
+            yield 1
+
+    start = time.perf_counter()
+    group_count = 0
+    next_progress = progress_every
+    if jobs == 1:
+        written = write_serial()
+    else:
+        groups = iter_raw_groups(read_rows(input_stream, input_format))
+        written = write_chunks(writer, parallel.map_chunks(settle_raw_chunk, groups, jobs, parallel.CHUNK_SIZE,
+                                                           minimize_transfers, output_format, writer.key_fields))
+    for count in written:
+        group_count += count
+        if progress_every and group_count >= next_progress:
+            next_progress = (group_count // progress_every + 1) * progress_every
+            elapsed = time.perf_counter() - start
+            print(f"{group_count} groups, {group_count / elapsed:.0f} groups/s", file=log)
+    elapsed = time.perf_counter() - start
+
+    rate = group_count / elapsed if elapsed else 0
+    print(f"Settled {group_count} groups in {elapsed:.2f}s ({rate:.0f} groups/s)", file=log)
+    return group_count, elapsed
@@ -0,0 +1,61 @@
+"""Memoized settlement results.
+
+A settlement only depends on the people (in order, since the order breaks
+ties), what each paid and the output options, so those are hashed into a
+key together with SETTLEMENT_FORMAT_VERSION, which stands for the engine
+itself. SettlementCache is a small in-memory LRU of calculate_bills output
+by key; BillDatabase keeps a larger, persistent one in the settlement_cache
+table (see load_settlement / store_settlement). Entries stored under an
+older version are never looked up again and age out of the LRU.
+"""
+import collections
+import hashlib
+import json
+
+from .group import columns
+from .settlement import calculate_bills
+
+# Part of every key. Bump it whenever calculate_bills can produce different output for
+# the same input, so results stored by an older version are never served again.
+# 2: payments made under a repeated name are added up
+SETTLEMENT_FORMAT_VERSION = 2
+
+
+def settlement_key(persons, show_individuals, minimize_transfers=False):
+    # A canonical hash of everything calculate_bills' output depends on; persons may be a Group
+    names, amounts = columns(persons)
+    payload = json.dumps([SETTLEMENT_FORMAT_VERSION, bool(show_individuals), bool(minimize_transfers),
+                          [[name, cents] for name, cents in zip(names, amounts)]],
+                         separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class SettlementCache:
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.entries = collections.OrderedDict()  # key -> calculate_bills output, least recently used first
+
+    def get(self, key):
+        results = self.entries.get(key)
+        if results is not None:
+            self.entries.move_to_end(key)
+        return results
+
+    def put(self, key, results):
+        self.entries[key] = results
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
+def cached_calculate_bills(db, persons, show_individuals, minimize_transfers=False, config_name=None):
+    # calculate_bills, reusing a result stored in db's settlement cache when there is one
+    key = settlement_key(persons, show_individuals, minimize_transfers)
+    results = db.load_settlement(key)
+    if results is None:
+        results = calculate_bills(persons, show_individuals, minimize_transfers)
+        db.store_settlement(key, results, config_name)
+    return results
@@ -0,0 +1,293 @@
+"""Command-line entry point: ``python -m fairshare <command> ...``."""
+import argparse
+import json
+import sys
+
+from . import batch, history_io
+from .database import CONFLICT_MODES, DEFAULT_DB_PATH, BillDatabase
+from .migrations import SCHEMA_VERSION
+from .months import add_months, current_month, month_key, previous_month
+from .money import format_cents, parse_cents
+from .settlement import Person, group_balances, paid_by_name, settle_balances
+
+
+def parse_payment(text):
+    name, sep, amount = text.rpartition('=')
+    if not sep or not name:
+        raise argparse.ArgumentTypeError(f"expected NAME=AMOUNT, got {text!r}")
+    try:
+        return Person(name, parse_cents(amount))
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def cmd_settle(args):
+    persons = args.payments
+    shares, balances = group_balances(persons)
+    transfers = settle_balances(balances, args.minimize)
+    total = sum(p.val for p in persons)
+
+    if args.json:
+        output = {
+            'total': total,
+            'transfers': [{'from': d, 'to': c, 'amount': a} for d, c, a in transfers],
+        }
+        if args.individuals:
+            output['shares'] = shares
+        print(json.dumps(output))
+    else:
+        print(f"Total Bill: ${format_cents(total)}")
+        for debtor_name, creditor_name, pay_amount in transfers:
+            print(f"{debtor_name} pays {creditor_name} ${format_cents(pay_amount)}")
+        if args.individuals:
+            for name, share in shares.items():
+                if share > 0:
+                    print(f"{name} is actually paying: ${format_cents(share)}")
+                else:
+                    print(f"{name} is owed: ${format_cents(-share)}")
+
+    if args.config:
+        if total <= 0:
+            print("No bill to update as total is $0.", file=sys.stderr)
+        else:
+            with BillDatabase(args.db) as db:
+                if not db.record_bill(args.config, args.month, total, paid_by_name(persons)):
+                    print(f"Configuration with name '{args.config}' does not exist.", file=sys.stderr)
+                    return 1
+    return 0
+
+
+def cmd_configs(args):
+    with BillDatabase(args.db) as db:
+        for config_name in db.list_configurations():
+            print(f"{config_name}: {', '.join(db.load_person_names(config_name))}")
+    return 0
+
+
+def cmd_history(args):
+    with BillDatabase(args.db) as db:
+        start, end = args.start, args.end
+        if args.last:
+            end = end or current_month()
+            start = add_months(end, 1 - args.last)
+        if args.person:
+            rows = db.fetch_person_history(args.config, args.person, start, end)
+            value_key = 'amount'
+        else:
+            rows = db.fetch_history(args.config, start, end)
+            value_key = 'total_bill'
+    if args.json:
+        print(json.dumps(rows))
+    else:
+        for row in rows:
+            print(f"{row['month']}\t{format_cents(row[value_key])}")
+    return 0
+
+
+def cmd_summary(args):
+    with BillDatabase(args.db) as db:
+        if args.yearly:
+            rows = db.fetch_yearly_totals(args.config)
+        else:
+            rows = db.fetch_summary(args.config, args.start, args.end)
+    if args.json:
+        print(json.dumps(rows))
+    elif args.yearly:
+        for row in rows:
+            print(f"{row['year']}\t{format_cents(row['total_bill'])}\t{row['months']} month(s)")
+    else:
+        print("month\ttotal\t3-month avg\t12-month avg\tyear on year")
+        for row in rows:
+            yoy = format_cents(row['yoy_delta']) if row['yoy_delta'] is not None else '-'
+            print(f"{row['month']}\t{format_cents(row['total_bill'])}\t{format_cents(round(row['avg_3']))}\t"
+                  f"{format_cents(round(row['avg_12']))}\t{yoy}")
+    return 0
+
+
+def cmd_record(args):
+    with BillDatabase(args.db) as db:
+        try:
+            found = db.insert_or_update_history(args.config, args.month, args.amount)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+        if not found:
+            print(f"Configuration with name '{args.config}' does not exist.", file=sys.stderr)
+            return 1
+    return 0
+
+
+def cmd_migrate(args):
+    # Opening the database applies any pending migrations
+    with BillDatabase(args.db) as db:
+        path = db.path
+    print(f"{path} is at schema version {SCHEMA_VERSION}")
+    return 0
+
+
+def cmd_batch(args):
+    input_format = args.format or batch.guess_format(args.input)
+    output_format = args.output_format or batch.guess_format(args.output, default='jsonl')
+
+    input_stream = sys.stdin if args.input == '-' else open(args.input, newline='')
+    output_stream = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+    try:
+        batch.run_batch(input_stream, output_stream, input_format, output_format,
+                        args.minimize, args.progress, jobs=args.jobs or None)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        if input_stream is not sys.stdin:
+            input_stream.close()
+        if output_stream is not sys.stdout:
+            output_stream.close()
+    return 0
+
+
+def cmd_resettle(args):
+    output_format = args.format or batch.guess_format(args.output, default='jsonl')
+    with BillDatabase(args.db) as db:
+        if args.config and db.get_config_id(args.config) is None:
+            print(f"Configuration with name '{args.config}' does not exist.", file=sys.stderr)
+            return 1
+        output_stream = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+        try:
+            batch.resettle(db, output_stream, output_format, args.start, args.end, args.config,
+                           args.minimize, args.jobs or None)
+        finally:
+            if output_stream is not sys.stdout:
+                output_stream.close()
+    return 0
+
+
+def cmd_import(args):
+    input_format = args.format or batch.guess_format(args.input)
+    input_stream = sys.stdin if args.input == '-' else open(args.input, newline='')
+    try:
+        with BillDatabase(args.db) as db:
+            read, written = history_io.import_history(db, input_stream, input_format, args.on_conflict)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        if input_stream is not sys.stdin:
+            input_stream.close()
+    print(f"Imported {written} of {read} month(s)", file=sys.stderr)
+    return 0
+
+
+def cmd_export(args):
+    output_format = args.format or batch.guess_format(args.output)
+    with BillDatabase(args.db) as db:
+        if args.config and db.get_config_id(args.config) is None:
+            print(f"Configuration with name '{args.config}' does not exist.", file=sys.stderr)
+            return 1
+        output_stream = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+        try:
+            history_io.export_history(db, output_stream, output_format, args.config, args.start, args.end)
+        finally:
+            if output_stream is not sys.stdout:
+                output_stream.close()
+    return 0
+
+
+def cmd_serve(args):
+    from . import server
+    server.run(args.host, args.port, args.db, args.workers)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m fairshare', description="Bill's Bill Calculator without the GUI.")
+    parser.add_argument('--db', help=f"path to the SQLite database (default: $FAIRSHARE_DB, else {DEFAULT_DB_PATH} "
+                                     "next to the program)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    settle = commands.add_parser('settle', help="work out who pays whom")
+    settle.add_argument('payments', nargs='+', type=parse_payment, metavar='NAME=AMOUNT')
+    settle.add_argument('--individuals', action='store_true', help="also show what each person ends up paying")
+    settle.add_argument('--minimize', action='store_true', help="search for fewer transfers")
+    settle.add_argument('--json', action='store_true', help="print machine-readable output")
+    settle.add_argument('--config', help="record the payments and total in this configuration's history")
+    settle.add_argument('--month', type=month_key, default=previous_month(), help="month to record against (default: %(default)s)")
+    settle.set_defaults(func=cmd_settle)
+
+    configs = commands.add_parser('configs', help="list saved configurations")
+    configs.set_defaults(func=cmd_configs)
+
+    history = commands.add_parser('history', help="show a configuration's monthly totals")
+    history.add_argument('config')
+    history.add_argument('--person', help="show what this person paid instead of the totals")
+    history.add_argument('--from', dest='start', type=month_key, metavar='MONTH', help="first month to show")
+    history.add_argument('--to', dest='end', type=month_key, metavar='MONTH', help="last month to show")
+    history.add_argument('--last', type=int, metavar='N', help="only the N months up to --to (default: this month)")
+    history.add_argument('--json', action='store_true', help="print machine-readable output")
+    history.set_defaults(func=cmd_history)
+
+    summary = commands.add_parser('summary', help="show rolling averages and year-on-year changes")
+    summary.add_argument('config')
+    summary.add_argument('--yearly', action='store_true', help="show yearly totals instead")
+    summary.add_argument('--from', dest='start', type=month_key, metavar='MONTH', help="first month to show")
+    summary.add_argument('--to', dest='end', type=month_key, metavar='MONTH', help="last month to show")
+    summary.add_argument('--json', action='store_true', help="print machine-readable output")
+    summary.set_defaults(func=cmd_summary)
+
+    record = commands.add_parser('record', help="set a configuration's total for a month")
+    record.add_argument('config')
+    record.add_argument('month', type=month_key)
+    record.add_argument('amount', type=parse_cents)
+    record.set_defaults(func=cmd_record)
+
+    migrate = commands.add_parser('migrate', help="upgrade the database to the current schema")
+    migrate.set_defaults(func=cmd_migrate)
+
+    batch_parser = commands.add_parser('batch', help="settle many groups streamed from CSV or JSONL")
+    batch_parser.add_argument('input', nargs='?', default='-', help="group,name,amount records (default: stdin)")
+    batch_parser.add_argument('-o', '--output', default='-', help="where to write transfers (default: stdout)")
+    batch_parser.add_argument('--format', choices=batch.FORMATS, help="input format (default: from the file extension, else csv)")
+    batch_parser.add_argument('--output-format', choices=batch.FORMATS, help="output format (default: from the file extension, else jsonl)")
+    batch_parser.add_argument('--minimize', action='store_true', help="search for fewer transfers")
+    batch_parser.add_argument('--progress', type=int, default=0, metavar='N', help="report throughput every N groups")
+    batch_parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                              help="settle on N worker processes, 0 for one per CPU (default: %(default)s)")
+    batch_parser.set_defaults(func=cmd_batch)
+
+    resettle = commands.add_parser('resettle', help="settle recorded months again from the stored payments")
+    resettle.add_argument('--config', help="only this configuration (default: all of them)")
+    resettle.add_argument('--from', dest='start', type=month_key, metavar='MONTH', help="first month to settle")
+    resettle.add_argument('--to', dest='end', type=month_key, metavar='MONTH', help="last month to settle")
+    resettle.add_argument('-o', '--output', default='-', help="where to write transfers (default: stdout)")
+    resettle.add_argument('--format', choices=batch.FORMATS, help="output format (default: from the file extension, else jsonl)")
+    resettle.add_argument('--minimize', action='store_true', help="search for fewer transfers")
+    resettle.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                          help="settle on N worker processes, 0 for one per CPU (default: %(default)s)")
+    resettle.set_defaults(func=cmd_resettle)
+
+    import_parser = commands.add_parser('import', help="add many months of history from CSV or JSONL in one go")
+    import_parser.add_argument('input', nargs='?', default='-', help="config,month,total records (default: stdin)")
+    import_parser.add_argument('--format', choices=history_io.FORMATS, help="input format (default: from the file extension, else csv)")
+    import_parser.add_argument('--on-conflict', choices=CONFLICT_MODES, default='replace',
+                               help="what to do with a month that already has a total (default: %(default)s)")
+    import_parser.set_defaults(func=cmd_import)
+
+    export = commands.add_parser('export', help="write history as CSV or JSONL that import reads back")
+    export.add_argument('--config', help="only this configuration (default: all of them)")
+    export.add_argument('--from', dest='start', type=month_key, metavar='MONTH', help="first month to write")
+    export.add_argument('--to', dest='end', type=month_key, metavar='MONTH', help="last month to write")
+    export.add_argument('-o', '--output', default='-', help="where to write the history (default: stdout)")
+    export.add_argument('--format', choices=history_io.FORMATS, help="output format (default: from the file extension, else csv)")
+    export.set_defaults(func=cmd_export)
+
+    serve = commands.add_parser('serve', help="serve settlement and history as a local JSON API")
+    serve.add_argument('--host', default='127.0.0.1', help="address to listen on (default: %(default)s)")
+    serve.add_argument('--port', type=int, default=8080, help="port to listen on (default: %(default)s)")
+    serve.add_argument('--workers', type=int, default=4, help="database and settlement threads (default: %(default)s)")
+    serve.set_defaults(func=cmd_serve)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
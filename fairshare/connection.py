@@ -0,0 +1,41 @@
+"""Opening configurations.db: where it lives and how connections are set up.
+
+Every connection runs in WAL mode, so readers never block the writer. It has
+a busy timeout, so a second instance of the app or a script using the same
+file waits its turn instead of failing with "database is locked". It uses
+synchronous=NORMAL, which is safe under WAL and avoids an fsync on every
+commit.
+"""
+import os
+import sqlite3
+import sys
+
+DB_FILENAME = 'configurations.db'
+BUSY_TIMEOUT = 10.0  # Seconds to wait for another connection's write lock
+CACHE_KIB = 16384  # Page cache per connection
+CACHED_STATEMENTS = 256  # Prepared statements kept per connection, keyed by SQL text
+
+
+def app_dir():
+    # The folder holding the program: next to the executable in a PyInstaller build,
+    # otherwise the folder bills.py and the fairshare package live in
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def resolve_db_path(path=None):
+    # An explicit path is used as given; otherwise $FAIRSHARE_DB, otherwise
+    # configurations.db in app_dir() whatever the working directory is
+    if path:
+        return path
+    return os.environ.get('FAIRSHARE_DB') or os.path.join(app_dir(), DB_FILENAME)
+
+
+def connect(path=None):
+    conn = sqlite3.connect(resolve_db_path(path), timeout=BUSY_TIMEOUT, cached_statements=CACHED_STATEMENTS)
+    conn.execute("PRAGMA journal_mode = WAL")  # Persistent; in-memory databases stay in 'memory'
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_KIB}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
@@ -0,0 +1,364 @@
+"""SQLite storage for saved configurations and monthly bill history.
+
+Amounts are integer cents and months are 'YYYY-MM' keys (see months.py);
+writes accept any month format month_key understands, except import_history,
+which takes the keys themselves (history_io.py converts them).
+"""
+import contextlib
+import datetime
+import itertools
+import sqlite3
+
+from . import summary, trace
+from .connection import DB_FILENAME, connect, resolve_db_path
+from .migrations import migrate
+from .money import format_cents
+from .months import add_months, current_month, month_key
+
+DEFAULT_DB_PATH = DB_FILENAME  # Looked up next to the program; see connection.resolve_db_path
+SETTLEMENT_CACHE_SIZE = 1000  # Stored settlements kept before the least recently used are evicted
+
+# What import_history does with a month that already has a total
+_IMPORT_HISTORY = {
+    'replace': '''INSERT INTO bill_history (config_id, bill_month, total_bill) VALUES (?, ?, ?)
+                  ON CONFLICT (config_id, bill_month) DO UPDATE SET total_bill = excluded.total_bill''',
+    'skip': '''INSERT INTO bill_history (config_id, bill_month, total_bill) VALUES (?, ?, ?)
+               ON CONFLICT (config_id, bill_month) DO NOTHING''',
+    'error': '''INSERT INTO bill_history (config_id, bill_month, total_bill) VALUES (?, ?, ?)''',
+}
+CONFLICT_MODES = tuple(_IMPORT_HISTORY)
+
+
+def check_total(total_bill):
+    # Every write of a month's total goes through here, so none can store a negative one
+    if total_bill < 0:
+        raise ValueError(f"Negative total: {format_cents(total_bill)}")
+
+
+class BillDatabase:
+    def __init__(self, path=None):
+        self.path = resolve_db_path(path)
+        self.conn = connect(self.path)
+        self.c = trace.cursor(self.conn)  # Times each statement when FAIRSHARE_TRACE is set
+        self.history_listeners = []  # Called with a config_name whenever its history changes
+        self.transaction_depth = 0
+        self.changed_in_transaction = set()  # config_names to announce once the transaction commits
+        # Uncomment the next 2 lines to reset the table
+        # self.c.execute('DROP TABLE IF EXISTS configurations')
+        # self.c.execute('DROP TABLE IF EXISTS bill_history')
+        migrate(self.conn)
+
+    def add_history_listener(self, callback):
+        self.history_listeners.append(callback)
+
+    def _history_changed(self, config_name):
+        if self.transaction_depth:
+            self.changed_in_transaction.add(config_name)
+            return
+        for callback in self.history_listeners:
+            callback(config_name)
+
+    def _commit(self):
+        # Inside transaction() the commit is left to the outermost block
+        if not self.transaction_depth:
+            self.conn.commit()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        # Groups every write in the block into one commit. The outermost block takes the
+        # write lock up front with BEGIN IMMEDIATE: a deferred transaction that reads
+        # before it writes cannot wait for a commit made meanwhile by another connection,
+        # and fails with "database is locked" without using the busy timeout. Nested
+        # blocks are savepoints, so an exception only undoes the writes of the block it
+        # escapes from.
+        outermost = not self.transaction_depth
+        savepoint = f"transaction_{self.transaction_depth}"
+        self.c.execute("BEGIN IMMEDIATE" if outermost else f"SAVEPOINT {savepoint}")
+        self.transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self.transaction_depth -= 1
+            if outermost:
+                self.conn.rollback()
+                self.changed_in_transaction.clear()
+            else:
+                self.c.execute(f"ROLLBACK TO {savepoint}")
+                self.c.execute(f"RELEASE {savepoint}")
+            raise
+        self.transaction_depth -= 1
+        if not outermost:
+            self.c.execute(f"RELEASE {savepoint}")
+            return
+        self.conn.commit()
+        changed, self.changed_in_transaction = self.changed_in_transaction, set()
+        for config_name in changed:
+            self._history_changed(config_name)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def list_configurations(self):
+        return [row[0] for row in self.c.execute('SELECT config_name FROM configurations')]
+
+    def load_person_names(self, config_name):
+        # Returns the configuration's names in order, or None if there is no such configuration
+        config_id = self.get_config_id(config_name)
+        if config_id is None:
+            return None
+        self.c.execute('''SELECT name FROM people
+                        WHERE config_id = ? AND active
+                        ORDER BY position''', (config_id,))
+        return [row[0] for row in self.c.fetchall()]
+
+    def get_config_id(self, config_name):
+        self.c.execute("SELECT config_id FROM configurations WHERE config_name=?", (config_name,))
+        row = self.c.fetchone()
+        return row[0] if row else None
+
+    def save_configuration(self, config_name, person_names, show_individuals):
+        # Insert or update configuration, keeping its config_id so the history stays attached
+        self.c.execute("INSERT OR REPLACE INTO configurations (config_id, config_name, person_names, show_individuals) VALUES ((SELECT config_id FROM configurations WHERE config_name = ?), ?, NULL, ?)", (config_name, config_name, show_individuals))
+        config_id = self.get_config_id(config_name)
+
+        # Stored settlements for the old line-up are dropped when it changes
+        if self.load_person_names(config_name) != list(person_names):
+            self.c.execute("DELETE FROM settlement_cache WHERE config_id = ?", (config_id,))
+
+        # Everyone not in the new list becomes a former member
+        self.c.execute("UPDATE people SET active = 0 WHERE config_id = ?", (config_id,))
+        self.c.executemany('''INSERT INTO people (config_id, name, position, active)
+                            VALUES (?, ?, ?, 1)
+                            ON CONFLICT (config_id, name) DO UPDATE
+                            SET position = excluded.position, active = 1''',
+                           [(config_id, name, position) for position, name in enumerate(person_names)])
+        self._commit()
+
+    def delete_configuration(self, config_name):
+        config_id = self.get_config_id(config_name)
+        if config_id is None:
+            return
+        self.c.execute('''DELETE FROM payments
+                        WHERE person_id IN (SELECT person_id FROM people WHERE config_id = ?)''', (config_id,))
+        self.c.execute("DELETE FROM people WHERE config_id = ?", (config_id,))
+        # config_ids are reused, so nothing may be left for the next configuration to inherit
+        self.c.execute("DELETE FROM bill_history WHERE config_id = ?", (config_id,))
+        summary.delete(self.c, config_id)
+        self.c.execute("DELETE FROM settlement_cache WHERE config_id = ?", (config_id,))
+        self.c.execute("DELETE FROM configurations WHERE config_id = ?", (config_id,))
+        self._commit()
+        self._history_changed(config_name)
+
+    def insert_or_update_history(self, config_name, month, total_bill):
+        # Records total_bill (cents) for config_name's month. Returns False if the
+        # configuration does not exist; a negative total_bill raises ValueError.
+        found = self._upsert_history(config_name, month, total_bill)
+        self._commit()
+        if found:
+            self._history_changed(config_name)
+        return found
+
+    def record_bill(self, config_name, month, total_bill, payments):
+        # Records total_bill and each person's payment (a {name: cents} dict) for
+        # config_name's month in one transaction. Payments from people who are not
+        # saved in the configuration are left out.
+        # Returns False if the configuration does not exist.
+        month = month_key(month)
+        found = self._upsert_history(config_name, month, total_bill)
+        if found:
+            config_id = self.get_config_id(config_name)
+            self.c.executemany('''INSERT INTO payments (person_id, bill_month, amount)
+                                SELECT person_id, ?, ? FROM people WHERE config_id = ? AND name = ?
+                                ON CONFLICT (person_id, bill_month) DO UPDATE SET amount = excluded.amount''',
+                               [(month, amount, config_id, name) for name, amount in payments.items()])
+        self._commit()
+        if found:
+            self._history_changed(config_name)
+        return found
+
+    def _upsert_history(self, config_name, month, total_bill):
+        check_total(total_bill)
+        month = month_key(month)
+        self.c.execute('''INSERT INTO bill_history (config_id, total_bill, bill_month)
+                        SELECT config_id, ?, ? FROM configurations WHERE config_name = ?
+                        ON CONFLICT (config_id, bill_month) DO UPDATE SET total_bill = excluded.total_bill''',
+                       (total_bill, month, config_name))
+        if self.c.rowcount == 0:
+            return False
+        summary.refresh_month(self.c, self.get_config_id(config_name), month)
+        return True
+
+    def import_history(self, records, on_conflict='replace'):
+        # Writes (config_name, 'YYYY-MM' month, total_bill cents) records with a single
+        # executemany in one transaction, then rebuilds the statistics of each
+        # configuration written to once instead of refreshing them month by month.
+        # records may be any iterable and is consumed as it is written. on_conflict
+        # decides what happens to a month that already has a total, in the database or
+        # earlier in records: 'replace' it, 'skip' the record, or 'error'. An unknown
+        # configuration, a conflict under 'error' or an exception raised by records
+        # writes nothing. Returns the number of months written.
+        if on_conflict not in _IMPORT_HISTORY:
+            raise ValueError(f"Unknown conflict mode: {on_conflict!r}")
+        config_ids = dict(self.c.execute("SELECT config_name, config_id FROM configurations").fetchall())
+        written_to = {}  # config_id -> config_name
+        current = None
+
+        def rows():
+            nonlocal current
+            for current in records:
+                config_name, month, total_bill = current
+                config_id = config_ids.get(config_name)
+                if config_id is None:
+                    raise ValueError(f"Configuration with name '{config_name}' does not exist.")
+                check_total(total_bill)
+                written_to[config_id] = config_name
+                yield config_id, month, total_bill
+
+        with self.transaction():
+            try:
+                self.c.executemany(_IMPORT_HISTORY[on_conflict], rows())
+            except sqlite3.IntegrityError:
+                # The record that failed is the last one handed to SQLite
+                raise ValueError(f"'{current[0]}' already has a total for {current[1]}") from None
+            written = self.c.rowcount
+            for config_id, config_name in written_to.items():
+                summary.rebuild(self.c, config_id)
+                self._history_changed(config_name)
+        return written
+
+    def load_settlement(self, key):
+        # The stored calculate_bills output for a settlement_key, or None
+        self.c.execute("SELECT results FROM settlement_cache WHERE key = ?", (key,))
+        row = self.c.fetchone()
+        if row is None:
+            return None
+        self.c.execute('''UPDATE settlement_cache SET last_used = (SELECT MAX(last_used) + 1 FROM settlement_cache)
+                        WHERE key = ?''', (key,))
+        self._commit()
+        return row[0]
+
+    def store_settlement(self, key, results, config_name=None, limit=SETTLEMENT_CACHE_SIZE):
+        # Stores calculate_bills output under its settlement_key, evicting the least
+        # recently used entries beyond limit. Entries stored for a configuration are
+        # dropped when its people change or it is deleted.
+        self.c.execute('''INSERT OR REPLACE INTO settlement_cache (key, config_id, results, last_used)
+                        VALUES (?, (SELECT config_id FROM configurations WHERE config_name = ?), ?,
+                                (SELECT COALESCE(MAX(last_used), 0) + 1 FROM settlement_cache))''',
+                       (key, config_name, results))
+        self.c.execute('''DELETE FROM settlement_cache WHERE last_used <= (
+                            SELECT last_used FROM settlement_cache ORDER BY last_used DESC LIMIT 1 OFFSET ?)''',
+                       (limit,))
+        self._commit()
+
+    def fetch_history(self, config_name, start=None, end=None):
+        # Monthly totals for config_name between the start and end 'YYYY-MM' keys
+        # (inclusive, either may be None), oldest first. The range and the ordering
+        # both come straight off the (config_id, bill_month) index.
+        self.c.execute('''SELECT bill_month, total_bill FROM bill_history
+                        WHERE config_id = (SELECT config_id FROM configurations WHERE config_name = ?)
+                          AND bill_month BETWEEN ? AND ?
+                        ORDER BY bill_month''', (config_name, start or '', end or '9999-99'))
+        return [{'month': row[0], 'total_bill': row[1]} for row in self.c.fetchall()]  # total_bill in cents
+
+    def fetch_last_months(self, config_name, count, end=None):
+        # The count calendar months up to and including end (default: this month)
+        end = end or current_month()
+        return self.fetch_history(config_name, add_months(end, 1 - count), end)
+
+    def fetch_year_to_date(self, config_name, year=None):
+        today = datetime.date.today()
+        year = year or today.year
+        end = current_month(today) if year == today.year else f"{year:04d}-12"
+        return self.fetch_history(config_name, f"{year:04d}-01", end)
+
+    def fetch_monthly_data(self, config_name):
+        # Fetch all monthly data for the given config_name, oldest first
+        return self.fetch_history(config_name)
+
+    def fetch_summary(self, config_name, start=None, end=None):
+        # Monthly totals with their precomputed statistics, oldest first: avg_3 and
+        # avg_12 are the rolling 3- and 12-month averages (cents, not rounded) and
+        # yoy_delta the change from the same month a year earlier (None if that
+        # month has no total)
+        self.c.execute('''SELECT bill_month, total_bill, avg_3, avg_12, yoy_delta FROM bill_summary
+                        WHERE config_id = (SELECT config_id FROM configurations WHERE config_name = ?)
+                          AND bill_month BETWEEN ? AND ?
+                        ORDER BY bill_month''', (config_name, start or '', end or '9999-99'))
+        return [{'month': row[0], 'total_bill': row[1], 'avg_3': row[2], 'avg_12': row[3], 'yoy_delta': row[4]}
+                for row in self.c.fetchall()]
+
+    def fetch_yearly_totals(self, config_name):
+        # [{'year', 'total_bill' (cents), 'months' (how many have a total)}], oldest first
+        self.c.execute('''SELECT year, total_bill, months FROM yearly_totals
+                        WHERE config_id = (SELECT config_id FROM configurations WHERE config_name = ?)
+                        ORDER BY year''', (config_name,))
+        return [{'year': row[0], 'total_bill': row[1], 'months': row[2]} for row in self.c.fetchall()]
+
+    def fetch_person_history(self, config_name, person_name, start=None, end=None):
+        # One person's payments between start and end, via the (config_id, name)
+        # and (person_id, bill_month) indexes
+        self.c.execute('''SELECT pay.bill_month, pay.amount
+                        FROM payments pay
+                        JOIN people p ON p.person_id = pay.person_id
+                        JOIN configurations c ON c.config_id = p.config_id
+                        WHERE c.config_name = ? AND p.name = ?
+                          AND pay.bill_month BETWEEN ? AND ?
+                        ORDER BY pay.bill_month''', (config_name, person_name, start or '', end or '9999-99'))
+        return [{'month': row[0], 'amount': row[1]} for row in self.c.fetchall()]  # amount in cents
+
+    def fetch_payments(self, config_name, month):
+        # {name: cents} for everyone who has a recorded payment in config_name's month
+        self.c.execute('''SELECT p.name, pay.amount
+                        FROM payments pay
+                        JOIN people p ON p.person_id = pay.person_id
+                        JOIN configurations c ON c.config_id = p.config_id
+                        WHERE c.config_name = ? AND pay.bill_month = ?
+                        ORDER BY p.position''', (config_name, month_key(month)))
+        return dict(self.c.fetchall())
+
+    def iter_history(self, config_name=None, start=None, end=None):
+        # Yields (config_name, month, total_bill cents) for every month between start
+        # and end, for one configuration or all of them, ordered by configuration name
+        # and month. Rows come off the (config_id, bill_month) index as they are
+        # consumed, so the history is never held in memory all at once.
+        if config_name is None:
+            configs = self.conn.execute(
+                "SELECT config_name, config_id FROM configurations ORDER BY config_name").fetchall()
+        else:
+            configs = [(config_name, self.get_config_id(config_name))]
+        rows = trace.cursor(self.conn)
+        for config_name, config_id in configs:
+            rows.execute('''SELECT bill_month, total_bill FROM bill_history
+                            WHERE config_id = ? AND bill_month BETWEEN ? AND ?
+                            ORDER BY bill_month''', (config_id, start or '', end or '9999-99'))
+            for month, total_bill in rows:
+                yield config_name, month, total_bill
+
+    def iter_month_payments(self, start=None, end=None, config_name=None):
+        # Yields ((config_name, month), names, amounts) for every month with recorded
+        # payments between start and end, for one configuration or all of them,
+        # ordered by configuration name and month with names in saved order. Each
+        # configuration is read through the people and payments indexes on its own
+        # cursor, so only one configuration's rows are in memory at a time.
+        if config_name is None:
+            config_names = [row[0] for row in self.conn.execute(
+                "SELECT config_name FROM configurations ORDER BY config_name")]
+        else:
+            config_names = [config_name]
+        rows = trace.cursor(self.conn)
+        for config_name in config_names:
+            rows.execute('''SELECT pay.bill_month, p.name, pay.amount
+                            FROM configurations c
+                            JOIN people p ON p.config_id = c.config_id
+                            JOIN payments pay ON pay.person_id = p.person_id
+                            WHERE c.config_name = ? AND pay.bill_month BETWEEN ? AND ?
+                            ORDER BY pay.bill_month, p.position''', (config_name, start or '', end or '9999-99'))
+            for month, group in itertools.groupby(rows.fetchall(), key=lambda row: row[0]):
+                group = list(group)
+                yield (config_name, month), tuple(row[1] for row in group), tuple(row[2] for row in group)
@@ -0,0 +1,79 @@
+"""Largest-triangle-three-buckets (LTTB) downsampling for plotting long series.
+
+A line chart cannot show more points than it has pixels across, yet drawing
+cost grows with every point handed to it. lttb picks at most `threshold`
+points to draw. It always keeps the first and last points. The rest are
+split into equal buckets, and from each bucket it keeps the point that forms
+the largest triangle with the point kept before it and the average of the
+next bucket. Peaks and troughs, which make large triangles, survive; runs of
+similar values collapse to one point.
+
+NumPy is optional, as in vectorized.py: with it, each bucket's triangle
+areas are one array expression; without it, a plain loop picks the same
+points (barring exact ties in area that floating point rounding breaks
+differently).
+"""
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def lttb(xs, ys, threshold):
+    # Indices, in increasing order, of the points to keep out of the x-sorted series
+    # (xs, ys); every index when there are no more than threshold points
+    count = len(xs)
+    if threshold >= count or count <= 2:
+        return list(range(count))
+    threshold = max(threshold, 3)
+    if numpy is not None:
+        return _lttb_numpy(numpy.asarray(xs, dtype=float), numpy.asarray(ys, dtype=float), threshold)
+
+    bounds = _bucket_bounds(count, threshold)
+    kept = [0]
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = bounds[bucket], bounds[bucket + 1]
+        # The average of the next bucket; the last point stands in for the one after the last
+        next_end = bounds[bucket + 2] if bucket + 2 < len(bounds) else count
+        next_x = sum(xs[end:next_end]) / (next_end - end)
+        next_y = sum(ys[end:next_end]) / (next_end - end)
+
+        px, py = xs[previous], ys[previous]
+        # Twice the triangle's area; the factor and the sign do not change which is largest
+        previous = max(range(start, end),
+                       key=lambda i: abs((px - next_x) * (ys[i] - py) - (px - xs[i]) * (next_y - py)))
+        kept.append(previous)
+    kept.append(count - 1)
+    return kept
+
+
+def _bucket_bounds(count, threshold):
+    # threshold - 1 indices; bucket b is bounds[b]:bounds[b + 1], splitting the points
+    # between the first and the last as evenly as whole points allow
+    every = (count - 2) / (threshold - 2)
+    bounds = [int(bucket * every) + 1 for bucket in range(threshold - 1)]
+    bounds[-1] = count - 1  # int() of the last product can round down
+    return bounds
+
+
+def _lttb_numpy(xs, ys, threshold):
+    count = len(xs)
+    bounds = numpy.array(_bucket_bounds(count, threshold))
+    # Each bucket's average, and the last point standing in for the bucket after the last
+    sums_x = numpy.add.reduceat(xs[:count - 1], bounds[:-1])
+    sums_y = numpy.add.reduceat(ys[:count - 1], bounds[:-1])
+    sizes = numpy.diff(bounds)
+    next_x = numpy.append(sums_x[1:] / sizes[1:], xs[-1])
+    next_y = numpy.append(sums_y[1:] / sizes[1:], ys[-1])
+
+    kept = numpy.empty(threshold, dtype=numpy.intp)
+    kept[0], kept[-1] = 0, count - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = bounds[bucket], bounds[bucket + 1]
+        px, py = xs[previous], ys[previous]
+        areas = numpy.abs((px - next_x[bucket]) * (ys[start:end] - py) - (px - xs[start:end]) * (next_y[bucket] - py))
+        previous = start + int(areas.argmax())
+        kept[bucket + 1] = previous
+    return kept
@@ -0,0 +1,96 @@
+"""A group's people and payments held column by column.
+
+A list of Person objects costs an object, its attribute storage and a boxed
+int for every member. Group keeps one list of names and one array('q') of
+integer cents instead, about a sixth of the memory for large groups (the
+name strings themselves are shared, not copied, between a group and its
+snapshots). settle_group, settlement_key, calculate_bills and BillDatabase's
+record_bill read the two columns directly, and the array hands NumPy its
+buffer without a copy. Indexing or iterating a Group gives PersonView
+objects, which read and write the columns in place, for code written
+against Person.
+"""
+from array import array
+
+
+class PersonView:
+    # A Person-like window onto one member of a Group; it follows the position, so
+    # views taken before a remove may point at a different member afterwards
+    __slots__ = ('group', 'index')
+
+    def __init__(self, group, index):
+        self.group = group
+        self.index = index
+
+    @property
+    def name(self):
+        return self.group.names[self.index]
+
+    @property
+    def val(self):
+        return self.group.amounts[self.index]
+
+    @val.setter
+    def val(self, cents):
+        self.group.amounts[self.index] = cents
+
+
+def columns(persons):
+    # (names, amounts) for a Group, without copying, or for any sequence of Person-likes
+    if isinstance(persons, Group):
+        return persons.names, persons.amounts
+    return [p.name for p in persons], [p.val for p in persons]
+
+
+class Group:
+    def __init__(self, names=(), amounts=None):
+        self.names = list(names)
+        self.amounts = array('q', amounts) if amounts is not None else array('q', bytes(8 * len(self.names)))
+        if len(self.amounts) != len(self.names):
+            raise ValueError("names and amounts must be the same length")
+
+    @classmethod
+    def from_persons(cls, persons):
+        return cls([p.name for p in persons], [p.val for p in persons])
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, index):
+        if not -len(self.names) <= index < len(self.names):
+            raise IndexError("group index out of range")
+        return PersonView(self, index % len(self.names))
+
+    def __iter__(self):
+        return (PersonView(self, i) for i in range(len(self.names)))
+
+    def items(self):
+        # (name, cents) pairs, so a Group can stand in for a {name: cents} dict
+        return zip(self.names, self.amounts)
+
+    def total(self):
+        return sum(self.amounts)
+
+    def index(self, name):
+        return self.names.index(name)
+
+    def append(self, name, cents=0):
+        self.names.append(name)
+        self.amounts.append(cents)
+
+    def remove(self, name):
+        # Removes every member called name
+        keep = [i for i, member in enumerate(self.names) if member != name]
+        if len(keep) != len(self.names):
+            self.names = [self.names[i] for i in keep]
+            self.amounts = array('q', (self.amounts[i] for i in keep))
+
+    def clear_amounts(self):
+        self.amounts = array('q', bytes(8 * len(self.names)))
+
+    def snapshot(self):
+        # An independent copy, e.g. to hand to another thread while this one keeps changing
+        copy = Group()
+        copy.names = self.names[:]
+        copy.amounts = self.amounts[:]
+        return copy
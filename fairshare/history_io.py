@@ -0,0 +1,89 @@
+"""Bulk import and export of monthly bill totals as CSV or JSONL.
+
+Each record is one configuration's total for one month: ``config``,
+``month`` ('YYYY-MM' or 'MM/YYYY') and ``total`` in dollars, e.g.
+``12.34``. Export writes the same fields, so an exported file imports back
+unchanged. Both directions stream: records are validated as they are read
+and handed straight to BillDatabase.import_history, which writes them all
+with one executemany in one transaction, and export writes each row as the
+cursor yields it.
+"""
+import csv
+import json
+import operator
+import re
+
+from .money import format_cents, parse_cents
+from .months import month_key
+
+FORMATS = ('csv', 'jsonl')
+FIELDS = ('config', 'month', 'total')
+
+_MONTH_KEY = re.compile(r'[0-9]{4}-(?:0[1-9]|1[0-2])')  # Already a key; month_key would return it as is
+
+
+def read_history(stream, fmt='csv'):
+    # Yields (config_name, 'YYYY-MM' month, total cents) for each record, raising
+    # ValueError with the line number for the first one that does not parse
+    if fmt == 'csv':
+        reader = csv.reader(stream)
+        header = next(reader, [])
+        if not set(FIELDS) <= set(header):
+            raise ValueError(f"Bad header on line 1: expected the columns {', '.join(FIELDS)}")
+        fields = operator.itemgetter(*(header.index(field) for field in FIELDS))  # Cheaper than a dict per row
+        rows = ((reader.line_num, values) for values in reader if values)
+    elif fmt == 'jsonl':
+        fields = operator.itemgetter(*FIELDS)
+        rows = ((line_number, line) for line_number, line in enumerate(stream, 1) if line.strip())
+    else:
+        raise ValueError(f"Unknown format: {fmt!r}")
+
+    for line_number, row in rows:
+        try:
+            if fmt == 'jsonl':
+                row = json.loads(row)  # JSONDecodeError is a ValueError
+            config_name, month, total = fields(row)
+            cents = parse_cents(total)
+            if cents < 0:
+                raise ValueError(f"Negative total: {total!r}")
+            month = str(month)
+            if not _MONTH_KEY.fullmatch(month):
+                month = month_key(month)
+        except (IndexError, KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Bad record on line {line_number}: {e}") from None
+        yield str(config_name), month, cents
+
+
+def import_history(db, stream, fmt='csv', on_conflict='replace'):
+    # Reads every record in stream into db's history in one transaction; a bad record
+    # anywhere leaves the history untouched. See BillDatabase.import_history for
+    # on_conflict. Returns (records read, months written).
+    read = 0
+
+    def records():
+        nonlocal read
+        for read, record in enumerate(read_history(stream, fmt), 1):
+            yield record
+
+    written = db.import_history(records(), on_conflict)
+    return read, written
+
+
+def export_history(db, stream, fmt='csv', config_name=None, start=None, end=None):
+    # Writes config_name's history between the start and end months (all
+    # configurations and months by default) to stream. Returns the number of months.
+    if fmt == 'csv':
+        writer = csv.writer(stream)
+        writer.writerow(FIELDS)
+        write = writer.writerow
+    elif fmt == 'jsonl':
+        def write(row):
+            stream.write(json.dumps(dict(zip(FIELDS, row))) + '\n')
+    else:
+        raise ValueError(f"Unknown format: {fmt!r}")
+
+    count = 0
+    for config_name, month, total_bill in db.iter_history(config_name, start, end):
+        write((config_name, month, format_cents(total_bill)))
+        count += 1
+    return count
@@ -0,0 +1,25 @@
+"""Running totals for live recalculation while amounts are being typed."""
+from .group import Group
+
+
+class LiveLedger:
+    # Keeps each person's payment and the group total up to date one edit at a time:
+    # set_amount is O(1), so the total shown while typing is never re-summed. Shares
+    # and balances come from the settlement run on persons() once typing pauses.
+    def __init__(self, names=()):
+        self.group = Group(names)
+        self.names = self.group.names
+        self.paid = self.group.amounts
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.total = 0
+
+    def set_amount(self, name, cents):
+        # Raises OverflowError, leaving everything as it was, if cents does not fit in int64
+        i = self.index[name]
+        previous = self.paid[i]
+        self.paid[i] = cents
+        self.total += cents - previous
+
+    def persons(self):
+        # A snapshot Group suitable for calculate_bills
+        return self.group.snapshot()
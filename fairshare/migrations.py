@@ -0,0 +1,198 @@
+"""Versioned schema migrations, tracked with ``PRAGMA user_version``.
+
+Each entry in MIGRATIONS upgrades the database by one version and runs in
+its own transaction together with the version bump, so an interrupted
+upgrade leaves the database at the last completed version. Migrations are
+set-based SQL and tolerate databases that were partly upgraded by older
+builds (which never set user_version), so running them again is safe.
+"""
+import sqlite3
+
+from . import summary, trace
+
+
+def _create_base_tables(c):
+    # The schema as first shipped
+    c.execute('''CREATE TABLE IF NOT EXISTS configurations (
+                config_id INTEGER PRIMARY KEY,
+                config_name TEXT UNIQUE,
+                person_names TEXT,
+                show_individuals BOOLEAN)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS bill_history (
+                bill_id INTEGER PRIMARY KEY,
+                config_id INTEGER,
+                total_bill REAL,
+                bill_month TEXT,
+                FOREIGN KEY (config_id) REFERENCES configurations(config_id))''')
+
+
+def _convert_months_to_mm_yyyy(c):
+    # Replaces updateDatabase.py: 'YYYY-MM' -> 'MM/YYYY' in one statement. Rows
+    # already in MM/YYYY don't match the GLOB, so this is a no-op the second time.
+    c.execute('''UPDATE OR REPLACE bill_history
+                SET bill_month = substr(bill_month, 6, 2) || '/' || substr(bill_month, 1, 4)
+                WHERE bill_month GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]' ''')
+
+
+def _convert_total_bill_to_cents(c):
+    # total_bill was REAL dollars; rebuild the table so it holds integer cents
+    columns = {row[1]: row[2] for row in c.execute("PRAGMA table_info(bill_history)")}
+    if columns.get('total_bill', '').upper() != 'REAL':
+        return
+
+    c.execute('''CREATE TABLE bill_history_cents (
+                bill_id INTEGER PRIMARY KEY,
+                config_id INTEGER,
+                total_bill INTEGER,
+                bill_month TEXT,
+                FOREIGN KEY (config_id) REFERENCES configurations(config_id))''')
+    c.execute('''INSERT INTO bill_history_cents (bill_id, config_id, total_bill, bill_month)
+                SELECT bill_id, config_id, CAST(ROUND(total_bill * 100) AS INTEGER), bill_month
+                FROM bill_history''')
+    c.execute('DROP TABLE bill_history')
+    c.execute('ALTER TABLE bill_history_cents RENAME TO bill_history')
+
+
+def _unique_history_month(c):
+    # One row per configuration and month so history writes can be a single UPSERT
+    create_index = '''CREATE UNIQUE INDEX IF NOT EXISTS idx_bill_history_config_month
+                    ON bill_history (config_id, bill_month)'''
+    try:
+        c.execute(create_index)
+    except sqlite3.IntegrityError:
+        # Duplicates written before the index existed keep the most recent row.
+        # Only done when needed: it is the slowest step on large histories.
+        c.execute('''DELETE FROM bill_history WHERE bill_id IN (
+                        SELECT bill_id FROM (
+                            SELECT bill_id, ROW_NUMBER() OVER (
+                                PARTITION BY config_id, bill_month ORDER BY bill_id DESC) AS newest
+                            FROM bill_history)
+                        WHERE newest > 1)''')
+        c.execute(create_index)
+
+
+def _create_people_and_payments(c):
+    # One row per member of a configuration; former members are kept with
+    # active = 0 so their payment history stays queryable
+    c.execute('''CREATE TABLE IF NOT EXISTS people (
+                person_id INTEGER PRIMARY KEY,
+                config_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                active BOOLEAN NOT NULL DEFAULT 1,
+                UNIQUE (config_id, name),
+                FOREIGN KEY (config_id) REFERENCES configurations(config_id))''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_people_config_position
+                ON people (config_id, active, position)''')
+
+    # What each person paid towards a month's bill, in cents
+    c.execute('''CREATE TABLE IF NOT EXISTS payments (
+                payment_id INTEGER PRIMARY KEY,
+                person_id INTEGER NOT NULL,
+                bill_month TEXT NOT NULL,
+                amount INTEGER NOT NULL,
+                UNIQUE (person_id, bill_month),
+                FOREIGN KEY (person_id) REFERENCES people(person_id))''')
+
+    # Split the legacy comma-joined person_names column into people rows with a
+    # recursive CTE, then clear it so it is never read again
+    c.execute('''WITH RECURSIVE split (config_id, position, name, rest) AS (
+                    SELECT config_id, -1, NULL, person_names || ','
+                    FROM configurations WHERE person_names IS NOT NULL
+                    UNION ALL
+                    SELECT config_id, position + 1,
+                           substr(rest, 1, instr(rest, ',') - 1),
+                           substr(rest, instr(rest, ',') + 1)
+                    FROM split WHERE rest <> '')
+                INSERT OR IGNORE INTO people (config_id, name, position)
+                SELECT config_id, name, position FROM split WHERE name <> '' ''')
+    c.execute("UPDATE configurations SET person_names = NULL")
+
+
+def _sortable_month_keys(c):
+    # 'MM/YYYY' (and hand-typed 'M/YYYY') -> 'YYYY-MM', which sorts chronologically
+    # so range queries and ORDER BY can run straight off the (config_id, bill_month)
+    # and (person_id, bill_month) indexes
+    for table in ('bill_history', 'payments'):
+        c.execute(f'''UPDATE OR REPLACE {table}
+                    SET bill_month = substr(bill_month, 4, 4) || '-' || substr(bill_month, 1, 2)
+                    WHERE bill_month GLOB '[0-9][0-9]/[0-9][0-9][0-9][0-9]' ''')
+        c.execute(f'''UPDATE OR REPLACE {table}
+                    SET bill_month = substr(bill_month, 3, 4) || '-0' || substr(bill_month, 1, 1)
+                    WHERE bill_month GLOB '[0-9]/[0-9][0-9][0-9][0-9]' ''')
+
+
+def _create_summary_tables(c):
+    # Rolling averages, year-over-year changes and yearly totals, filled in from the
+    # existing history; from here on BillDatabase keeps them current on every write
+    summary.create_tables(c)
+    summary.rebuild(c)
+
+
+def _create_settlement_cache(c):
+    # Stored calculate_bills output by settlement_key (see cache.py). last_used is a
+    # counter rather than a timestamp so the eviction order has no ties.
+    c.execute('''CREATE TABLE IF NOT EXISTS settlement_cache (
+                key TEXT PRIMARY KEY,
+                config_id INTEGER,
+                results TEXT NOT NULL,
+                last_used INTEGER NOT NULL,
+                FOREIGN KEY (config_id) REFERENCES configurations(config_id)) WITHOUT ROWID''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_settlement_cache_last_used
+                ON settlement_cache (last_used)''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_settlement_cache_config
+                ON settlement_cache (config_id)''')
+
+
+def _drop_orphaned_history(c):
+    # delete_configuration used to leave bill_history behind; drop what no configuration
+    # owns before a reused config_id can inherit it
+    c.execute("DELETE FROM bill_history WHERE config_id NOT IN (SELECT config_id FROM configurations)")
+    c.execute("DELETE FROM bill_summary WHERE config_id NOT IN (SELECT config_id FROM configurations)")
+    c.execute("DELETE FROM yearly_totals WHERE config_id NOT IN (SELECT config_id FROM configurations)")
+
+
+# MIGRATIONS[i] upgrades the database from version i to version i + 1
+MIGRATIONS = [
+    _create_base_tables,
+    _convert_months_to_mm_yyyy,
+    _convert_total_bill_to_cents,
+    _unique_history_month,
+    _create_people_and_payments,
+    _sortable_month_keys,
+    _create_summary_tables,
+    _create_settlement_cache,
+    _drop_orphaned_history,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    # Applies every pending migration; returns how many were applied
+    current = schema_version(conn)
+    if current > SCHEMA_VERSION:
+        raise RuntimeError(f"Database schema version {current} is newer than this program supports ({SCHEMA_VERSION})")
+
+    # Manage the transactions explicitly so DDL and the version bump commit together
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None
+    try:
+        for version in range(current, SCHEMA_VERSION):
+            c = trace.cursor(conn)
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                with trace.span('migration', version=version + 1, step=MIGRATIONS[version].__name__):
+                    MIGRATIONS[version](c)
+                c.execute(f"PRAGMA user_version = {version + 1}")
+                c.execute("COMMIT")
+            except BaseException:
+                c.execute("ROLLBACK")
+                raise
+    finally:
+        conn.isolation_level = isolation_level
+    return SCHEMA_VERSION - current
@@ -0,0 +1,42 @@
+"""Integer-cents money helpers shared by the settlement engine and the database."""
+import re
+from decimal import Decimal, DecimalException, InvalidOperation, ROUND_HALF_UP
+
+# Plain amounts with at most two decimals need no rounding, so they skip Decimal
+_PLAIN_AMOUNT = re.compile(r'(-?)([0-9]+)(?:\.([0-9]{0,2}))?')
+
+
+# Money is handled as integer cents everywhere so balances sum to exactly zero
+def parse_cents(value):
+    # Accepts "12.34", "12", 12.34 etc. and rounds half-up to the nearest cent
+    match = _PLAIN_AMOUNT.fullmatch(str(value).strip())
+    if match:
+        sign, dollars, cents = match.groups()
+        cents = int(dollars) * 100 + int((cents or '').ljust(2, '0'))
+        return -cents if sign else cents
+    try:
+        amount = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {value!r}")
+    if not amount.is_finite():
+        raise ValueError(f"Invalid amount: {value!r}")
+    try:
+        # Too many digits for the default 28-digit context, e.g. 1e30
+        return int(amount.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP) * 100)
+    except DecimalException:
+        raise ValueError(f"Invalid amount: {value!r}") from None
+
+
+def format_cents(cents):
+    sign = '-' if cents < 0 else ''
+    dollars, cents = divmod(abs(cents), 100)
+    return f"{sign}{dollars}.{cents:02d}"
+
+
+def split_cents(total, count):
+    # Even split where the leftover cents go one each to the first people in order,
+    # so the shares always add back up to the total
+    if count <= 0:
+        return []
+    share, leftover = divmod(total, count)
+    return [share + 1 if i < leftover else share for i in range(count)]
@@ -0,0 +1,43 @@
+"""Bill months are stored as 'YYYY-MM' keys, which sort chronologically as text."""
+import datetime
+import re
+
+_KEY = re.compile(r'^(\d{4})-(\d{1,2})$')
+_DISPLAY = re.compile(r'^(\d{1,2})/(\d{4})$')
+
+
+def month_key(text):
+    # Accepts 'YYYY-MM' or the 'MM/YYYY' the UI shows and returns the 'YYYY-MM' key
+    text = str(text).strip()
+    match = _KEY.match(text)
+    if match:
+        year, month = match.groups()
+    else:
+        match = _DISPLAY.match(text)
+        if not match:
+            raise ValueError(f"Invalid month: {text!r} (expected MM/YYYY or YYYY-MM)")
+        month, year = match.groups()
+    if not 1 <= int(month) <= 12:
+        raise ValueError(f"Invalid month: {text!r}")
+    return f"{int(year):04d}-{int(month):02d}"
+
+
+def format_month(key):
+    # 'YYYY-MM' -> 'MM/YYYY' for display
+    year, month = key.split('-')
+    return f"{month}/{year}"
+
+
+def add_months(key, count):
+    year, month = map(int, key.split('-'))
+    year, month = divmod(year * 12 + month - 1 + count, 12)
+    return f"{year:04d}-{month + 1:02d}"
+
+
+def current_month(today=None):
+    return (today or datetime.date.today()).strftime("%Y-%m")
+
+
+def previous_month(today=None):
+    # The month bills are entered for by default
+    return add_months(current_month(today), -1)
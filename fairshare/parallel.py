@@ -0,0 +1,99 @@
+"""Settling many groups at once on a pool of worker processes.
+
+settle_balances is pure Python and holds the GIL, so threads would not help;
+groups are instead sent to worker processes in chunks. Each group travels as
+(key, names, amounts): a tuple of names and a tuple of integer cents, which
+pickle far smaller and faster than Person objects, and only the transfers
+come back (batch.py goes further and has its workers parse amounts and
+format output, leaving the parent little more than splitting the input).
+Re-settling stored history sends even less: each task is a list of
+configuration names, and the worker reads their payments itself over its own
+connection (WAL lets any number of readers share the file), so the parent
+process does little but merge.
+
+Results are yielded in input order whatever order the chunks finish in, so
+the output is identical to settling serially, and at most a few chunks per
+worker are in flight, so memory stays flat on any input size.
+"""
+import collections
+import concurrent.futures
+import itertools
+import os
+
+from .database import BillDatabase
+from .settlement import settle_group
+
+CHUNK_SIZE = 512  # Groups per task: large enough that pickling and IPC stay a small fraction of the work
+CONFIGS_PER_TASK = 4  # Configurations per re-settling task, each usually a few hundred months
+CHUNKS_PER_JOB = 4  # Chunks in flight per worker, so no worker waits while the parent merges
+
+_worker_dbs = {}  # path -> BillDatabase, opened once per worker process
+
+
+def default_jobs():
+    return os.cpu_count() or 1
+
+
+def map_chunks(fn, items, jobs=None, chunk_size=CHUNK_SIZE, *args):
+    # Yields fn(chunk, *args) for each list of up to chunk_size items, in input order,
+    # running fn on jobs worker processes (default: one per CPU). fn must be a
+    # module-level function so the workers can unpickle it.
+    jobs = jobs or default_jobs()
+    items = iter(items)
+    chunks = iter(lambda: list(itertools.islice(items, chunk_size)), [])
+    if jobs == 1:
+        for chunk in chunks:
+            yield fn(chunk, *args)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(executor.submit(fn, chunk, *args))
+            if len(pending) >= jobs * CHUNKS_PER_JOB:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def settle_chunk(chunk, minimize_transfers=False):
+    # [(key, names, amounts), ...] -> [(key, transfers), ...]
+    results = []
+    for key, names, amounts in chunk:
+        results.append((key, settle_group(names, amounts, minimize_transfers)[1]))
+    return results
+
+
+def settle_parallel(items, minimize_transfers=False, jobs=None, chunk_size=CHUNK_SIZE):
+    # Yields (key, transfers) for each (key, names, amounts) in items, in input order
+    for results in map_chunks(settle_chunk, items, jobs, chunk_size, minimize_transfers):
+        yield from results
+
+
+def resettle_configs(db, config_name=None):
+    # The configurations resettle_history covers, in output order
+    return [config_name] if config_name is not None else sorted(db.list_configurations())
+
+
+def resettle_chunk(config_names, path, start=None, end=None, minimize_transfers=False):
+    # [config_name, ...] -> [((config_name, month), transfers), ...], read from the database at path
+    db = _worker_dbs.get(path)
+    if db is None:
+        db = _worker_dbs[path] = BillDatabase(path)
+    results = []
+    for config_name in config_names:
+        results.extend(settle_chunk(db.iter_month_payments(start, end, config_name), minimize_transfers))
+    return results
+
+
+def resettle_history(db, start=None, end=None, config_name=None, minimize_transfers=False, jobs=None):
+    # Re-settles every recorded month between start and end (inclusive 'YYYY-MM'
+    # keys, either may be None) from the payments stored in db, for one
+    # configuration or all of them. Yields ((config_name, month), transfers)
+    # ordered by configuration name and month.
+    if (jobs or default_jobs()) == 1:
+        yield from settle_chunk(db.iter_month_payments(start, end, config_name), minimize_transfers)
+        return
+    for results in map_chunks(resettle_chunk, resettle_configs(db, config_name), jobs, CONFIGS_PER_TASK,
+                              db.path, start, end, minimize_transfers):
+        yield from results
@@ -0,0 +1,290 @@
+"""A local HTTP/JSON API: ``python -m fairshare serve``.
+
+Endpoints (amounts in requests are dollars as in the CLI, e.g. "12.34";
+amounts in responses are integer cents):
+
+    POST /settle                {"payments": {"Ann": "30", "Bob": "12.50"},
+                                 "individuals": false, "minimize": false,
+                                 "config": null, "month": "2024-05"}
+    GET  /configs               [{"name": ..., "people": [...]}]
+    GET  /history/<config>      ?from=YYYY-MM&to=YYYY-MM&person=<name>
+    POST /history/<config>      {"month": "2024-05", "amount": "120.00"}
+    GET  /summary/<config>      ?from=YYYY-MM&to=YYYY-MM&yearly=1
+    POST /batch                 CSV or JSONL records in, JSONL transfers out, both as in batch.py
+
+The server is a single asyncio loop using only the standard library. SQLite
+calls and settlement run on a bounded thread pool, and each worker thread
+has its own BillDatabase, so slow queries never block the loop and there
+are never more SQLite connections than workers.
+"""
+import asyncio
+import concurrent.futures
+import io
+import json
+import threading
+import urllib.parse
+
+from . import batch
+from .database import BillDatabase
+from .months import month_key, previous_month
+from .money import parse_cents
+from .settlement import Person, group_balances, settle_balances
+
+MAX_BODY = 64 * 1024 * 1024
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           411: 'Length Required', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class DatabasePool:
+    # A fixed number of worker threads, each lazily opening its own BillDatabase
+    def __init__(self, path=None, workers=4):
+        self.path = path
+        self.local = threading.local()
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fairshare-db')
+
+    def _call(self, fn, args):
+        db = getattr(self.local, 'db', None)
+        if db is None:
+            db = self.local.db = BillDatabase(self.path)
+        return fn(db, *args)
+
+    async def run(self, fn, *args):
+        # fn(db, *args) on a worker thread
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self._call, fn, args)
+
+    async def compute(self, fn, *args):
+        # fn(*args) on a worker thread, for CPU work that needs no database
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+def settle(payments, individuals=False, minimize=False):
+    # The same output as ``python -m fairshare settle --json``
+    if not isinstance(payments, dict):
+        raise ValueError("payments must be an object of name: amount")
+    persons = [Person(name, parse_cents(amount)) for name, amount in payments.items()]
+    if not persons:
+        raise ValueError("payments must name at least one person")
+    shares, balances = group_balances(persons)
+    output = {
+        'total': sum(p.val for p in persons),
+        'transfers': [{'from': d, 'to': c, 'amount': a} for d, c, a in settle_balances(balances, minimize)],
+    }
+    if individuals:
+        output['shares'] = shares
+    return output
+
+
+def list_configs(db):
+    return [{'name': name, 'people': db.load_person_names(name)} for name in db.list_configurations()]
+
+
+def fetch_for_config(db, fn, config_name, *args):
+    # fn(db, config_name, *args), or None when there is no such configuration; one
+    # job, so the lookup and the read use the same connection
+    if db.get_config_id(config_name) is None:
+        return None
+    return fn(db, config_name, *args)
+
+
+def settle_batch(body, fmt):
+    output = io.StringIO()
+    batch.run_batch(io.StringIO(body, newline=''), output, fmt, 'jsonl', log=io.StringIO())
+    return output.getvalue()
+
+
+class Server:
+    def __init__(self, db_path=None, workers=4):
+        self.pool = DatabasePool(db_path, workers)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self.read_request(reader)
+                except HTTPError as e:
+                    await self.respond(writer, e.status, {'error': str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                try:
+                    status, payload = 200, await self.dispatch(method, target, headers, body)
+                except HTTPError as e:
+                    status, payload = e.status, {'error': str(e)}
+                except (ValueError, KeyError, TypeError) as e:
+                    status, payload = 400, {'error': str(e)}
+                except Exception as e:
+                    status, payload = 500, {'error': f"{type(e).__name__}: {e}"}
+                await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def read_request(self, reader):
+        # Returns (method, target, headers, body), or None when the client hangs up
+        request_line = await read_line(reader)
+        if not request_line.strip():
+            return None
+        try:
+            method, target, _ = request_line.decode('latin-1').split()
+        except ValueError:
+            raise HTTPError(400, "malformed request line") from None
+        headers = {}
+        while True:
+            line = await read_line(reader)
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        body = b''
+        if method in ('POST', 'PUT'):
+            if 'content-length' not in headers:
+                raise HTTPError(411, "Content-Length is required")
+            length = headers['content-length']
+            if not (length.isascii() and length.isdigit()):  # No sign, spaces, underscores or '²'
+                raise HTTPError(400, f"invalid Content-Length: {length!r}")
+            length = int(length)
+            if length > MAX_BODY:
+                raise HTTPError(413, f"request body over {MAX_BODY} bytes")
+            body = await reader.readexactly(length)
+        return method, target, headers, body
+
+    async def respond(self, writer, status, payload, keep_alive):
+        if isinstance(payload, str):
+            content_type, data = 'application/x-ndjson', payload.encode('utf-8')
+        else:
+            content_type, data = 'application/json', json.dumps(payload).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + data)
+        await writer.drain()
+
+    async def dispatch(self, method, target, headers, body):
+        url = urllib.parse.urlsplit(target)
+        parts = [urllib.parse.unquote(part) for part in url.path.strip('/').split('/')]
+        query = dict(urllib.parse.parse_qsl(url.query))
+        route = parts[0] if parts else ''
+
+        if route == 'settle' and len(parts) == 1:
+            self.allow(method, 'POST')
+            return await self.settle(json_body(body))
+        if route == 'configs' and len(parts) == 1:
+            self.allow(method, 'GET')
+            return await self.pool.run(list_configs)
+        if route == 'history' and len(parts) == 2:
+            self.allow(method, 'GET', 'POST')
+            if method == 'GET':
+                return await self.history(parts[1], query)
+            return await self.record(parts[1], json_body(body))
+        if route == 'summary' and len(parts) == 2:
+            self.allow(method, 'GET')
+            if query.get('yearly'):
+                return await self.fetch(BillDatabase.fetch_yearly_totals, parts[1])
+            return await self.fetch(BillDatabase.fetch_summary, parts[1],
+                                    optional_month(query, 'from'), optional_month(query, 'to'))
+        if route == 'batch' and len(parts) == 1:
+            self.allow(method, 'POST')
+            fmt = 'jsonl' if 'json' in headers.get('content-type', '') else query.get('format', 'csv')
+            return await self.pool.compute(settle_batch, body.decode('utf-8'), fmt)
+        raise HTTPError(404, f"no such endpoint: {url.path}")
+
+    def allow(self, method, *allowed):
+        if method not in allowed:
+            raise HTTPError(405, f"{method} not allowed here (use {' or '.join(allowed)})")
+
+    async def settle(self, request):
+        require(request, 'payments')
+        output = await self.pool.compute(settle, request['payments'], request.get('individuals', False),
+                                         request.get('minimize', False))
+        config_name = request.get('config')
+        if config_name and output['total'] > 0:
+            payments = {name: parse_cents(amount) for name, amount in request['payments'].items()}
+            month = month_key(request.get('month') or previous_month())
+            if not await self.pool.run(BillDatabase.record_bill, config_name, month, output['total'], payments):
+                raise HTTPError(404, f"Configuration with name '{config_name}' does not exist.")
+        return output
+
+    async def history(self, config_name, query):
+        start, end = optional_month(query, 'from'), optional_month(query, 'to')
+        if query.get('person'):
+            return await self.fetch(BillDatabase.fetch_person_history, config_name, query['person'], start, end)
+        return await self.fetch(BillDatabase.fetch_history, config_name, start, end)
+
+    async def fetch(self, fn, config_name, *args):
+        # fn(db, config_name, *args) on the pool, answering an unknown configuration with a 404
+        result = await self.pool.run(fetch_for_config, fn, config_name, *args)
+        if result is None:
+            raise HTTPError(404, f"Configuration with name '{config_name}' does not exist.")
+        return result
+
+    async def record(self, config_name, request):
+        require(request, 'month', 'amount')
+        found = await self.pool.run(BillDatabase.insert_or_update_history, config_name,
+                                    month_key(request['month']), parse_cents(request['amount']))
+        if not found:
+            raise HTTPError(404, f"Configuration with name '{config_name}' does not exist.")
+        return {'config': config_name, 'month': month_key(request['month'])}
+
+    async def serve(self, host='127.0.0.1', port=8080, ready=None):
+        # Serves until cancelled; ready, if given, is called with the bound (host, port)
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        if ready:
+            ready(server.sockets[0].getsockname()[:2])
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.pool.close()
+
+
+async def read_line(reader):
+    # reader.readline(), answering lines longer than the stream's limit with a 400
+    try:
+        return await reader.readline()
+    except (asyncio.LimitOverrunError, ValueError):
+        raise HTTPError(400, "request line or header too long") from None
+
+
+def json_body(body):
+    try:
+        request = json.loads(body or b'{}')
+    except json.JSONDecodeError as e:
+        raise HTTPError(400, f"invalid JSON: {e}") from None
+    if not isinstance(request, dict):
+        raise HTTPError(400, "expected a JSON object")
+    return request
+
+
+def require(request, *fields):
+    missing = [field for field in fields if field not in request]
+    if missing:
+        raise HTTPError(400, f"missing required field{'s' if len(missing) > 1 else ''}: {', '.join(missing)}")
+
+
+def optional_month(query, name):
+    return month_key(query[name]) if query.get(name) else None
+
+
+def run(host='127.0.0.1', port=8080, db_path=None, workers=4):
+    def announce(address):
+        print(f"Serving on http://{address[0]}:{address[1]}", flush=True)
+    try:
+        asyncio.run(Server(db_path, workers).serve(host, port, announce))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,145 @@
+"""Settlement engine: works out who pays whom so everyone ends up paying an equal share."""
+import heapq
+
+from . import trace, vectorized
+from .group import columns
+from .money import format_cents, split_cents
+
+
+class Person:
+    __slots__ = ('name', 'val')
+
+    def __init__(self, name, val=0):
+        self.name = name
+        self.val = val  # Amount paid, in integer cents
+
+
+def _settle_exact_matches(debtors, creditors, transfers):
+    # Pair every debtor with a creditor owed exactly the same amount first;
+    # each such pair settles in a single transfer and drops out of the heaps
+    creditors_by_amount = {}
+    for credit, order, name in creditors:
+        creditors_by_amount.setdefault(credit, []).append((credit, order, name))
+
+    unmatched_debtors = []
+    for debt, order, name in sorted(debtors):
+        matches = creditors_by_amount.get(debt)
+        if matches:
+            credit, _, creditor_name = matches.pop(0)
+            transfers.append((name, creditor_name, -credit))
+        else:
+            unmatched_debtors.append((debt, order, name))
+
+    debtors[:] = unmatched_debtors
+    creditors[:] = [entry for matches in creditors_by_amount.values() for entry in matches]
+    heapq.heapify(debtors)
+    heapq.heapify(creditors)
+
+
+@trace.traced()
+def settle_balances(balances, minimize_transfers=False):
+    # balances maps each name to the integer cents they still owe (positive) or are
+    # owed (negative); they must sum to zero.
+    # Returns a list of (debtor, creditor, amount) transfers that clear every balance.
+    # Both sides are kept in max-heaps (negated amounts) so each step matches the
+    # largest remaining debtor with the largest remaining creditor: O(n log n) and
+    # never more than n - 1 transfers. Because the amounts are exact integers one
+    # side always reaches exactly zero per step, so no $0.00 transfers are emitted.
+    # The insertion order breaks ties so the result is deterministic.
+    debtors = []
+    creditors = []
+    for order, (name, amount) in enumerate(balances.items()):
+        if amount > 0:
+            debtors.append((-amount, order, name))
+        elif amount < 0:
+            creditors.append((amount, order, name))
+    return _settle_entries(debtors, creditors, minimize_transfers)
+
+
+def _settle_entries(debtors, creditors, minimize_transfers):
+    # The rest of settle_balances, from its (-|balance|, order, name) entries
+    heapq.heapify(debtors)
+    heapq.heapify(creditors)
+
+    transfers = []
+    if minimize_transfers:
+        _settle_exact_matches(debtors, creditors, transfers)
+
+    while debtors and creditors:
+        debt, debtor_order, debtor_name = heapq.heappop(debtors)
+        credit, creditor_order, creditor_name = heapq.heappop(creditors)
+
+        pay_amount = min(-debt, -credit)
+        transfers.append((debtor_name, creditor_name, pay_amount))
+
+        # Whoever is not fully settled goes back on their heap with the remainder
+        debt += pay_amount
+        credit += pay_amount
+        if debt < 0:
+            heapq.heappush(debtors, (debt, debtor_order, debtor_name))
+        if credit < 0:
+            heapq.heappush(creditors, (credit, creditor_order, creditor_name))
+
+    return transfers
+
+
+def paid_by_name(persons):
+    # {name: cents paid}, in order of first entry. Entries with the same name are one
+    # person who paid more than once, so their payments are added up.
+    paid = {}
+    for p in persons:
+        paid[p.name] = paid.get(p.name, 0) + p.val
+    return paid
+
+
+def group_balances(persons):
+    # Returns ({name: share}, {name: balance}) where balance is share minus what they paid.
+    # Entries with the same name are one person who paid more than once: their payments
+    # are added up and they get one share, in the place of their first entry.
+    paid = paid_by_name(persons)
+    shares = dict(zip(paid, split_cents(sum(paid.values()), len(paid))))
+    balances = {name: shares[name] - cents for name, cents in paid.items()}
+    return shares, balances
+
+
+def settle_group(names, amounts, minimize_transfers=False):
+    # group_balances and settle_balances in one step for parallel name and cents
+    # sequences: returns ({name: share}, transfers). Large groups go through the
+    # NumPy path (see vectorized.py), which makes the same transfers.
+    if vectorized.enabled_for(names):
+        arrays = vectorized.balances(amounts)
+        if arrays is not None:
+            shares, balances = arrays
+            if minimize_transfers:
+                transfers = _settle_entries(*vectorized.heap_entries(names, balances), True)
+            else:
+                transfers = vectorized.settle_packed(names, balances)
+            if transfers is not None:
+                return dict(zip(names, shares.tolist())), transfers
+    shares, balances = group_balances([Person(name, cents) for name, cents in zip(names, amounts)])
+    return shares, settle_balances(balances, minimize_transfers)
+
+
+@trace.traced()
+def calculate_bills(persons, show_individuals, minimize_transfers=False):
+    results = []
+
+    # Calculate each person's share and who pays whom; persons may be a Group
+    shares, transfers = settle_group(*columns(persons), minimize_transfers=minimize_transfers)
+
+    # Processing payments from debtors to creditors
+    for debtor_name, creditor_name, pay_amount in transfers:
+        # Formatting the transaction with HTML for green and bold "pays" and bold amount
+        transaction = f"{debtor_name} <b><span style='color: green;'>pays</span></b> {creditor_name} <b>${format_cents(pay_amount)}</b>"
+        results.append(transaction)
+
+    # If show_individuals is True, add individual's final balances. The transfers clear
+    # every balance, so what each person ends up paying is their share.
+    if show_individuals:
+        for name, adjusted_balance in shares.items():
+            if adjusted_balance > 0:
+                results.append(f"{name} is actually paying: <b>${format_cents(adjusted_balance)}</b>")
+            else:
+                results.append(f"{name} is owed: <b>${format_cents(-adjusted_balance)}</b>")
+
+    return "\n".join(results)
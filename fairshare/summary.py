@@ -0,0 +1,79 @@
+"""Precomputed monthly and yearly statistics for each configuration's bill history.
+
+bill_summary holds, for every recorded month, the total together with the
+rolling 3- and 12-month averages (over calendar months, so gaps in the
+history shorten the window instead of stretching it) and the change from the
+same month a year earlier. yearly_totals holds each calendar year's total.
+Both are kept up to date on write: a changed month only affects its own year
+and the summary rows from that month to twelve months later, so
+refresh_month touches at most 13 summary rows however long the history is.
+"""
+from .months import add_months
+
+# Calendar months since year 0, so windows can be expressed as ranges of months
+_MONTH_INDEX = "(CAST(substr(bill_month, 1, 4) AS INTEGER) * 12 + CAST(substr(bill_month, 6, 2) AS INTEGER) - 1)"
+
+_REFRESH_SUMMARY = f'''INSERT OR REPLACE INTO bill_summary (config_id, bill_month, total_bill, avg_3, avg_12, yoy_delta)
+    SELECT config_id, bill_month, total_bill, avg_3, avg_12, yoy_delta FROM (
+        SELECT config_id, bill_month, total_bill,
+               AVG(total_bill) OVER (PARTITION BY config_id ORDER BY month_index
+                                     RANGE BETWEEN 2 PRECEDING AND CURRENT ROW) AS avg_3,
+               AVG(total_bill) OVER (PARTITION BY config_id ORDER BY month_index
+                                     RANGE BETWEEN 11 PRECEDING AND CURRENT ROW) AS avg_12,
+               total_bill - FIRST_VALUE(total_bill) OVER (PARTITION BY config_id ORDER BY month_index
+                                                          RANGE BETWEEN 12 PRECEDING AND 12 PRECEDING) AS yoy_delta
+        FROM (SELECT config_id, bill_month, total_bill, {_MONTH_INDEX} AS month_index
+              FROM bill_history WHERE {{where}}))
+    WHERE {{keep}}'''
+
+_REFRESH_YEARS = '''INSERT OR REPLACE INTO yearly_totals (config_id, year, total_bill, months)
+    SELECT config_id, CAST(substr(bill_month, 1, 4) AS INTEGER), SUM(total_bill), COUNT(*)
+    FROM bill_history WHERE {where}
+    GROUP BY config_id, substr(bill_month, 1, 4)'''
+
+
+def create_tables(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS bill_summary (
+                config_id INTEGER NOT NULL,
+                bill_month TEXT NOT NULL,
+                total_bill INTEGER NOT NULL,
+                avg_3 REAL NOT NULL,
+                avg_12 REAL NOT NULL,
+                yoy_delta INTEGER,
+                PRIMARY KEY (config_id, bill_month)) WITHOUT ROWID''')
+    c.execute('''CREATE TABLE IF NOT EXISTS yearly_totals (
+                config_id INTEGER NOT NULL,
+                year INTEGER NOT NULL,
+                total_bill INTEGER NOT NULL,
+                months INTEGER NOT NULL,
+                PRIMARY KEY (config_id, year)) WITHOUT ROWID''')
+
+
+def rebuild(c, config_id=None):
+    # Recomputes everything for one configuration, or for all of them, in two passes
+    if config_id is None:
+        c.execute("DELETE FROM bill_summary")
+        c.execute("DELETE FROM yearly_totals")
+        c.execute(_REFRESH_SUMMARY.format(where="1", keep="1"))
+        c.execute(_REFRESH_YEARS.format(where="1"))
+    else:
+        delete(c, config_id)
+        c.execute(_REFRESH_SUMMARY.format(where="config_id = ?", keep="1"), (config_id,))
+        c.execute(_REFRESH_YEARS.format(where="config_id = ?"), (config_id,))
+
+
+def refresh_month(c, config_id, month):
+    # Brings the statistics up to date after config_id's 'YYYY-MM' month was written.
+    # Rows from the month to a year later are rewritten; reading from a year before
+    # the month covers the changed month's own averages and YoY delta.
+    c.execute(_REFRESH_SUMMARY.format(where="config_id = ? AND bill_month BETWEEN ? AND ?",
+                                      keep="bill_month >= ?"),
+              (config_id, add_months(month, -12), add_months(month, 12), month))
+    year = month[:4]
+    c.execute(_REFRESH_YEARS.format(where="config_id = ? AND bill_month BETWEEN ? AND ?"),
+              (config_id, f"{year}-01", f"{year}-12"))
+
+
+def delete(c, config_id):
+    c.execute("DELETE FROM bill_summary WHERE config_id = ?", (config_id,))
+    c.execute("DELETE FROM yearly_totals WHERE config_id = ?", (config_id,))
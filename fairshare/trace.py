@@ -0,0 +1,93 @@
+"""Timing spans for profiling, switched on by the FAIRSHARE_TRACE environment variable.
+
+FAIRSHARE_TRACE names the file the spans are written to when the process
+exits: a path ending in ``.json`` gets Chrome trace format (open it in
+chrome://tracing or https://ui.perfetto.dev), anything else gets one JSON
+object per line. When the variable is not set, span() hands back a shared
+do-nothing context manager and traced() returns functions unchanged, so the
+instrumentation costs next to nothing.
+"""
+import atexit
+import contextlib
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+
+TRACE_PATH = os.environ.get('FAIRSHARE_TRACE')
+enabled = bool(TRACE_PATH)
+
+events = []  # Chrome trace "complete" events, in the order the spans finished
+_NULL_SPAN = contextlib.nullcontext()
+_PID = os.getpid()
+
+
+class _Span:
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter()
+        event = {'name': self.name, 'ph': 'X', 'ts': self.start * 1e6, 'dur': (end - self.start) * 1e6,
+                 'pid': _PID, 'tid': threading.get_ident()}
+        if self.args:
+            event['args'] = self.args
+        events.append(event)  # list.append is atomic, so spans can end on any thread
+
+
+def span(name, **args):
+    # with span('settle', people=12): ... times the block under name
+    if not enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def traced(name=None):
+    # Decorator timing every call of a function; a no-op unless tracing is on
+    def decorate(fn):
+        if not enabled:
+            return fn
+        span_name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Span(span_name, None):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class TracingCursor(sqlite3.Cursor):
+    # A cursor that times each statement, for connections opened while tracing
+    def execute(self, sql, parameters=()):
+        with _Span('sql', {'sql': ' '.join(sql.split())}):
+            return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        with _Span('sql', {'sql': ' '.join(sql.split()), 'many': True}):
+            return super().executemany(sql, seq_of_parameters)
+
+
+def cursor(conn):
+    # conn.cursor(), timing every statement when tracing is on
+    return conn.cursor(TracingCursor) if enabled else conn.cursor()
+
+
+def write(path):
+    with open(path, 'w') as f:
+        if path.endswith('.json'):
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        else:
+            for event in events:
+                f.write(json.dumps(event) + '\n')
+
+
+if enabled:
+    atexit.register(write, TRACE_PATH)
@@ -0,0 +1,107 @@
+"""NumPy versions of the settlement steps, for very large groups.
+
+Above VECTOR_THRESHOLD people, building the shares, the balances and the
+debtor and creditor heap entries one Python object at a time is a large part
+of the work. Here the amounts live in one int64 array and those steps are
+array operations. The heap loop itself cannot be vectorized, but it gets
+cheaper too: each (-|balance|, order) entry is packed into a single int,
+-|balance| * count + order. Ints compare in the same order as the tuples
+and compare much faster. Since every comparison gives the same answer, the
+heaps evolve exactly as in the pure-Python path and the transfers are
+identical.
+
+NumPy is optional, and only imported once a group reaches VECTOR_THRESHOLD
+so that ``import fairshare`` and small settlements do not pay for it.
+Without it, the pure-Python path is used. It is also used for groups with
+repeated names, whose payments group_balances adds up into one person, and
+for amounts too large for int64.
+"""
+import heapq
+from array import array
+
+numpy = None  # Set by _load_numpy
+_numpy_missing = False
+
+VECTOR_THRESHOLD = 64  # People; below about this many the array setup costs more than it saves
+_INT64_LIMIT = 2 ** 62  # Largest magnitude the array arithmetic and packed keys may reach
+
+
+def _load_numpy():
+    # Imports NumPy on first use; False if it is not installed
+    global numpy, _numpy_missing
+    if numpy is None and not _numpy_missing:
+        try:
+            import numpy as module
+        except ImportError:
+            _numpy_missing = True
+        else:
+            numpy = module
+    return numpy is not None
+
+
+def enabled_for(names):
+    # Whether the vectorized path applies. Repeated names are left to the pure-Python
+    # path, which adds their payments up into one person.
+    return len(names) >= VECTOR_THRESHOLD and len(set(names)) == len(names) and _load_numpy()
+
+
+def balances(amounts):
+    # (shares, balances) int64 arrays as group_balances computes them, or None if the
+    # amounts are too large for int64
+    if isinstance(amounts, array) and amounts.typecode == 'q':
+        paid = numpy.frombuffer(amounts, dtype=numpy.int64)  # A Group's column, used in place
+    else:
+        try:
+            paid = numpy.array(amounts, dtype=numpy.int64)
+        except OverflowError:
+            return None
+    count = len(paid)
+    if int(numpy.abs(paid).max()) >= _INT64_LIMIT // count:
+        return None
+
+    # split_cents: the leftover cents go one each to the first people in order
+    share, leftover = divmod(int(paid.sum()), count)
+    shares = numpy.full(count, share, dtype=numpy.int64)
+    shares[:leftover] += 1
+    return shares, shares - paid
+
+
+def heap_entries(names, balances):
+    # settle_balances' (-|balance|, order, name) debtor and creditor entries, in the
+    # order it builds them
+    order = numpy.arange(len(balances))
+    names = numpy.array(names, dtype=object)
+    entries = []
+    for side in (balances > 0, balances < 0):
+        entries.append(list(zip((-numpy.abs(balances[side])).tolist(), order[side].tolist(), names[side].tolist())))
+    return entries[0], entries[1]
+
+
+def settle_packed(names, balances):
+    # settle_balances without minimize_transfers, on packed keys; None if the keys
+    # would not fit in int64
+    count = len(balances)
+    magnitude = numpy.abs(balances)
+    if int(magnitude.max()) >= _INT64_LIMIT // count:
+        return None
+    order = numpy.arange(count, dtype=numpy.int64)
+    keys = order - magnitude * count
+    debtors = keys[balances > 0].tolist()
+    creditors = keys[balances < 0].tolist()
+    heapq.heapify(debtors)
+    heapq.heapify(creditors)
+
+    pop, push = heapq.heappop, heapq.heappush
+    transfers = []
+    while debtors and creditors:
+        debt, debtor = divmod(pop(debtors), count)
+        credit, creditor = divmod(pop(creditors), count)
+        pay_amount = min(-debt, -credit)
+        transfers.append((names[debtor], names[creditor], pay_amount))
+        debt += pay_amount
+        credit += pay_amount
+        if debt < 0:
+            push(debtors, debt * count + debtor)
+        if credit < 0:
+            push(creditors, credit * count + creditor)
+    return transfers
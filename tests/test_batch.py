@@ -0,0 +1,30 @@
+"""python -m unittest discover tests"""
+import io
+import unittest
+
+from fairshare import batch
+
+REPEATED_NAMES = "group,name,amount\ng1,A,30\ng1,A,0\ng1,B,0\ng2,X,1\ng2,Y,0\n"
+
+
+class RunBatchTest(unittest.TestCase):
+    def run_batch(self, text, jobs):
+        output = io.StringIO()
+        batch.run_batch(io.StringIO(text), output, 'csv', 'csv', log=io.StringIO(), jobs=jobs)
+        return output.getvalue().splitlines()
+
+    def test_repeated_names_are_added_up(self):
+        expected = ['group,from,to,amount', 'g1,B,A,15.00', 'g2,Y,X,0.50']
+        self.assertEqual(self.run_batch(REPEATED_NAMES, 1), expected)
+        self.assertEqual(self.run_batch(REPEATED_NAMES, 2), expected)
+
+
+class ReadRowsTest(unittest.TestCase):
+    def test_malformed_jsonl_line_is_reported_with_its_number(self):
+        text = '{"group": "g", "name": "A", "amount": 1}\n\n{"group": "g"\n'
+        with self.assertRaisesRegex(ValueError, r'^Bad record on line 3: '):
+            list(batch.read_rows(io.StringIO(text), 'jsonl'))
+
+
+if __name__ == '__main__':
+    unittest.main()
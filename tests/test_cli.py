@@ -0,0 +1,44 @@
+"""python -m unittest discover tests"""
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from fairshare import cli
+from fairshare.database import BillDatabase
+
+
+class CLITestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'test.db')
+        with BillDatabase(self.path) as db:
+            db.save_configuration('H', ['A', 'B'], False)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+class SettleTest(CLITestCase):
+    def test_repeated_name_records_the_sum_of_its_payments(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            status = cli.main(['--db', self.path, 'settle', 'A=10', 'A=5', 'B=0', '--config', 'H', '--month', '2024-02'])
+        self.assertEqual(status, 0)
+        with BillDatabase(self.path) as db:
+            self.assertEqual(db.fetch_payments('H', '2024-02'), {'A': 1500, 'B': 0})
+            self.assertEqual(db.fetch_history('H'), [{'month': '2024-02', 'total_bill': 1500}])
+
+
+class RecordTest(CLITestCase):
+    def test_negative_total_is_refused(self):
+        with contextlib.redirect_stderr(io.StringIO()) as stderr:
+            status = cli.main(['--db', self.path, 'record', 'H', '2024-02', '--', '-5'])
+        self.assertEqual(status, 1)
+        self.assertIn("Negative total", stderr.getvalue())
+        with BillDatabase(self.path) as db:
+            self.assertEqual(db.fetch_history('H'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
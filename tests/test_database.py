@@ -0,0 +1,93 @@
+"""python -m unittest discover tests"""
+import os
+import tempfile
+import threading
+import unittest
+
+from fairshare.database import BillDatabase
+
+
+class DeleteConfigurationTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = BillDatabase(os.path.join(self.directory.name, 'test.db'))
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def test_new_configuration_does_not_inherit_deleted_history(self):
+        self.db.save_configuration('A', ['ann', 'bob'], False)
+        self.db.insert_or_update_history('A', '2024-01', 1000)
+        self.db.delete_configuration('A')
+        self.db.save_configuration('B', ['cy'], False)
+        self.assertEqual(self.db.fetch_history('B'), [])
+        self.assertEqual(self.db.fetch_summary('B'), [])
+        self.assertEqual(self.db.fetch_yearly_totals('B'), [])
+
+
+class NegativeTotalTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = BillDatabase(os.path.join(self.directory.name, 'test.db'))
+        self.db.save_configuration('A', ['ann', 'bob'], False)
+
+    def tearDown(self):
+        self.db.close()
+        self.directory.cleanup()
+
+    def test_every_write_path_rejects_a_negative_total(self):
+        writes = [
+            lambda: self.db.insert_or_update_history('A', '2024-01', -500),
+            lambda: self.db.record_bill('A', '2024-01', -500, {'ann': -500}),
+            lambda: self.db.import_history([('A', '2024-01', 100), ('A', '2024-02', -500)]),
+        ]
+        for write in writes:
+            with self.assertRaisesRegex(ValueError, 'Negative total: -5.00'):
+                write()
+        self.assertEqual(self.db.fetch_history('A'), [])
+        self.assertEqual(self.db.fetch_payments('A', '2024-01'), {})
+
+
+class TransactionTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'test.db')
+        with BillDatabase(self.path) as db:
+            db.save_configuration('A', ['ann', 'bob'], False)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_read_then_write_waits_for_another_connection(self):
+        # The transaction reads before it writes while a second connection commits a
+        # write in between; it must wait for that commit rather than fail with
+        # "database is locked"
+        read_done = threading.Event()
+        errors = []
+
+        def read_then_write():
+            try:
+                with BillDatabase(self.path) as db, db.transaction():
+                    db.get_config_id('A')
+                    read_done.set()
+                    threading.Event().wait(0.2)  # The other connection's write is waiting meanwhile
+                    db.insert_or_update_history('A', '2024-01', 1000)
+            except Exception as e:
+                errors.append(e)
+                read_done.set()
+
+        thread = threading.Thread(target=read_then_write)
+        thread.start()
+        read_done.wait()
+        with BillDatabase(self.path) as db:
+            db.insert_or_update_history('A', '2024-02', 2000)
+        thread.join()
+        self.assertEqual(errors, [])
+        with BillDatabase(self.path) as db:
+            self.assertEqual([(row['month'], row['total_bill']) for row in db.fetch_history('A')],
+                             [('2024-01', 1000), ('2024-02', 2000)])
+
+
+if __name__ == '__main__':
+    unittest.main()
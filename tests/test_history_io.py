@@ -0,0 +1,26 @@
+"""python -m unittest discover tests"""
+import io
+import unittest
+
+from fairshare.history_io import read_history
+
+
+class ReadHistoryTest(unittest.TestCase):
+    def test_jsonl_records(self):
+        text = '{"config": "home", "month": "03/2024", "total": "12.34"}\n\n{"config": "home", "month": "2024-04", "total": 5}\n'
+        self.assertEqual(list(read_history(io.StringIO(text), 'jsonl')),
+                         [('home', '2024-03', 1234), ('home', '2024-04', 500)])
+
+    def test_malformed_jsonl_line_is_reported_with_its_number(self):
+        text = '{"config": "home", "month": "2024-03", "total": 1}\n{"config": "home"\n'
+        with self.assertRaisesRegex(ValueError, r'^Bad record on line 2: '):
+            list(read_history(io.StringIO(text), 'jsonl'))
+
+    def test_csv_line_numbers_count_the_header(self):
+        text = 'config,month,total\nhome,2024-03,1\nhome,2024-04,-1\n'
+        with self.assertRaisesRegex(ValueError, r'^Bad record on line 3: '):
+            list(read_history(io.StringIO(text), 'csv'))
+
+
+if __name__ == '__main__':
+    unittest.main()
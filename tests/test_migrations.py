@@ -0,0 +1,84 @@
+"""python -m unittest discover tests"""
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from fairshare.migrations import SCHEMA_VERSION, migrate, schema_version
+
+
+class MigrateTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.conn = sqlite3.connect(os.path.join(self.directory.name, 'test.db'))
+        # A database as the first release left it: user_version 0, REAL dollar totals,
+        # months in whatever format was typed and names joined with commas
+        self.conn.executescript('''
+            CREATE TABLE configurations (
+                config_id INTEGER PRIMARY KEY,
+                config_name TEXT UNIQUE,
+                person_names TEXT,
+                show_individuals BOOLEAN);
+            CREATE TABLE bill_history (
+                bill_id INTEGER PRIMARY KEY,
+                config_id INTEGER,
+                total_bill REAL,
+                bill_month TEXT,
+                FOREIGN KEY (config_id) REFERENCES configurations(config_id));
+            INSERT INTO configurations VALUES (1, 'H', 'Ann,Bob,Cy', 0), (2, 'E', 'Dee', 1);
+            INSERT INTO bill_history (bill_id, config_id, total_bill, bill_month) VALUES
+                (1, 1, 10.5, '2024-01'),    -- becomes 01/2024 and is then a duplicate of 2
+                (2, 1, 20.25, '01/2024'),
+                (3, 1, 3.33, '2/2024'),
+                (4, 1, 30.0, '03/2024'),    -- collides with 5 once both are YYYY-MM
+                (5, 1, 31.0, '3/2024'),
+                (6, 2, 19.99, '12/2023'),
+                (7, 9, 1.0, '01/2024');     -- no configuration 9
+        ''')
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+        self.directory.cleanup()
+
+    def contents(self):
+        return (
+            self.conn.execute('''SELECT config_id, bill_month, total_bill, typeof(total_bill)
+                                 FROM bill_history ORDER BY config_id, bill_month''').fetchall(),
+            self.conn.execute("SELECT config_id, name, position, active FROM people ORDER BY config_id, position").fetchall(),
+            self.conn.execute("SELECT config_id, person_names FROM configurations ORDER BY config_id").fetchall(),
+            self.conn.execute("SELECT config_id, bill_month, total_bill FROM bill_summary ORDER BY config_id, bill_month").fetchall(),
+        )
+
+    def test_baseline_database_is_upgraded_once(self):
+        self.assertEqual(migrate(self.conn), SCHEMA_VERSION)
+        self.assertEqual(schema_version(self.conn), SCHEMA_VERSION)
+        history, people, configurations, summary = self.contents()
+        self.assertEqual(history, [
+            (1, '2024-01', 2025, 'integer'),  # The newest of the duplicates
+            (1, '2024-02', 333, 'integer'),
+            (1, '2024-03', 3100, 'integer'),  # UPDATE OR REPLACE keeps the row converted last
+            (2, '2023-12', 1999, 'integer'),
+        ])
+        self.assertEqual(people, [(1, 'Ann', 0, 1), (1, 'Bob', 1, 1), (1, 'Cy', 2, 1), (2, 'Dee', 0, 1)])
+        self.assertEqual(configurations, [(1, None), (2, None)])
+        self.assertEqual(summary, [row[:3] for row in history])
+
+        # A second run has nothing to do and changes nothing
+        upgraded = self.contents()
+        self.assertEqual(migrate(self.conn), 0)
+        self.assertEqual(self.contents(), upgraded)
+
+    def test_migrations_can_run_again_over_an_upgraded_database(self):
+        # Older builds never set user_version, so every migration must tolerate a
+        # database it has already upgraded
+        migrate(self.conn)
+        upgraded = self.contents()
+        self.conn.execute("PRAGMA user_version = 0")
+        self.assertEqual(migrate(self.conn), SCHEMA_VERSION)
+        self.assertEqual(schema_version(self.conn), SCHEMA_VERSION)
+        self.assertEqual(self.contents(), upgraded)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,26 @@
+"""python -m unittest discover tests"""
+import unittest
+
+from fairshare.money import parse_cents
+
+
+class ParseCentsTest(unittest.TestCase):
+    def test_plain_and_rounded_amounts(self):
+        self.assertEqual(parse_cents("12.34"), 1234)
+        self.assertEqual(parse_cents("-0.5"), -50)
+        self.assertEqual(parse_cents("1.005"), 101)
+
+    def test_amounts_beyond_decimal_precision_are_invalid(self):
+        # quantize raises decimal.InvalidOperation for these, which must come out as ValueError
+        for text in ("1e30", "1" * 28 + ".123", "-1e30"):
+            with self.assertRaises(ValueError):
+                parse_cents(text)
+
+    def test_non_numbers_are_invalid(self):
+        for text in ("abc", "nan", "inf", ""):
+            with self.assertRaises(ValueError):
+                parse_cents(text)
+
+
+if __name__ == '__main__':
+    unittest.main()
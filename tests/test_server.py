@@ -0,0 +1,55 @@
+"""python -m unittest discover tests"""
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from fairshare.database import BillDatabase
+from fairshare.server import HTTPError, Server
+
+
+class DispatchTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self.directory.name, 'test.db')
+        with BillDatabase(path) as db:
+            db.save_configuration('H', ['A', 'B'], False)
+        self.server = Server(path, workers=1)
+
+    def tearDown(self):
+        self.server.pool.close()
+        self.directory.cleanup()
+
+    def dispatch(self, method, target, request=None):
+        body = json.dumps(request).encode() if request is not None else b''
+        return asyncio.run(self.server.dispatch(method, target, {}, body))
+
+    def assertStatus(self, status, method, target, request=None):
+        with self.assertRaises(HTTPError) as raised:
+            self.dispatch(method, target, request)
+        self.assertEqual(raised.exception.status, status)
+        return str(raised.exception)
+
+    def test_unknown_configuration_is_404_for_get_and_post(self):
+        self.assertStatus(404, 'GET', '/history/nobody')
+        self.assertStatus(404, 'POST', '/history/nobody', {'month': '2024-01', 'amount': '1'})
+        self.assertStatus(404, 'GET', '/summary/nobody')
+        self.assertEqual(self.dispatch('GET', '/history/H'), [])
+
+    def test_missing_fields_are_400_with_their_names(self):
+        message = self.assertStatus(400, 'POST', '/history/H', {'month': '2024-01'})
+        self.assertEqual(message, "missing required field: amount")
+        message = self.assertStatus(400, 'POST', '/settle', {})
+        self.assertEqual(message, "missing required field: payments")
+
+
+    def test_negative_total_is_refused(self):
+        # handle_connection answers the ValueError with a 400
+        with self.assertRaisesRegex(ValueError, 'Negative total'):
+            self.dispatch('POST', '/history/H', {'month': '2024-01', 'amount': '-5'})
+        self.assertEqual(self.dispatch('GET', '/history/H'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+"""python -m unittest discover tests"""
+import random
+import unittest
+
+from fairshare import vectorized
+from fairshare.group import Group, columns
+from fairshare.settlement import Person, group_balances, settle_balances, settle_group
+
+
+class RepeatedNamesTest(unittest.TestCase):
+    def test_payments_under_one_name_are_added_up(self):
+        shares, balances = group_balances([Person('A', 3000), Person('A', 0), Person('B', 0)])
+        self.assertEqual(shares, {'A': 1500, 'B': 1500})
+        self.assertEqual(balances, {'A': -1500, 'B': 1500})
+
+    def test_repeated_names_still_settle(self):
+        _, transfers = settle_group(['A', 'B', 'A', 'C'], [1000, 0, 500, 0])
+        self.assertEqual(transfers, [('B', 'A', 500), ('C', 'A', 500)])
+
+
+@unittest.skipUnless(vectorized._load_numpy(), "NumPy is not installed")
+class VectorizedTest(unittest.TestCase):
+    def groups(self):
+        # Sizes at and above the threshold, with amounts that leave many equal balances
+        # (so the order ties are broken in matters) and a leftover cent to hand out
+        rng = random.Random(22)
+        for size in (vectorized.VECTOR_THRESHOLD, vectorized.VECTOR_THRESHOLD + 1, 1000):
+            names = [f"p{i}" for i in range(size)]
+            yield names, [rng.choice((0, 0, 500, 1250, 9999)) for _ in names]
+            yield names, [rng.randrange(-10_000, 1_000_000) for _ in names]
+
+    def test_same_transfers_as_the_pure_python_path(self):
+        for names, amounts in self.groups():
+            self.assertTrue(vectorized.enabled_for(names))
+            shares, balances = group_balances([Person(name, cents) for name, cents in zip(names, amounts)])
+            for minimize_transfers in (False, True):
+                with self.subTest(size=len(names), minimize_transfers=minimize_transfers):
+                    expected = (shares, settle_balances(balances, minimize_transfers))
+                    self.assertEqual(settle_group(names, amounts, minimize_transfers), expected)
+                    # A Group's int64 column is read in place rather than copied
+                    group = Group(names, amounts)
+                    self.assertEqual(settle_group(*columns(group), minimize_transfers=minimize_transfers), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()